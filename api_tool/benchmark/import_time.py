@@ -0,0 +1,129 @@
+# api_tool/benchmark/import_time.py
+"""
+CLI 启动开销基准
+
+  1. import 耗时：多次在全新解释器中 `import api_tool.main`，取中位数，
+     并用 `-X importtime` 列出最慢的模块、检查重依赖是否被提前加载；
+  2. 首请求耗时：从启动 `python -m api_tool.main -c ...` 到本地 Mock 服务
+     收到第一个请求的时间（纯文本数据集）。
+
+超过 --max-import-ms / --max-first-request-ms 时以非零状态码退出，便于在 CI 中卡住回归。
+
+运行：
+    python -m api_tool.benchmark.import_time --runs 5 --max-import-ms 300 --max-first-request-ms 2000
+"""
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import typer
+
+# 纯文本 JSONL 任务启动时不应加载的模块
+HEAVY_MODULES = ["pandas", "PIL", "tiktoken", "numpy", "matplotlib", "openai", "httpx", "rich"]
+
+
+def measure_import(runs: int) -> Tuple[float, List[Tuple[int, str]], List[str]]:
+    """返回 (import 中位耗时 ms, 最慢模块 [(累计 us, 模块名)], 已加载的重依赖)"""
+    timings = []
+    probe = (
+        "import sys, time, json; t = time.perf_counter(); import api_tool.main; "
+        "print(json.dumps([(time.perf_counter() - t) * 1000, "
+        f"[m for m in {HEAVY_MODULES!r} if m in sys.modules]]))"
+    )
+    loaded: List[str] = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+        elapsed, loaded = json.loads(out.stdout.strip().splitlines()[-1])
+        timings.append(elapsed)
+
+    # -X importtime 输出格式：import time: self [us] | cumulative | imported package
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import api_tool.main"],
+        capture_output=True, text=True, check=True,
+    )
+    slowest = []
+    for line in out.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        slowest.append((int(parts[1]), parts[2].rstrip()))
+    slowest.sort(reverse=True)
+    return statistics.median(timings), slowest[:15], loaded
+
+
+async def measure_first_request(workdir: Path) -> float:
+    """启动 CLI 子进程，返回到 Mock 服务收到首个请求的耗时（ms）"""
+    from api_tool.benchmark.mock_server import MockOpenAIServer, MockServerConfig
+
+    server = MockOpenAIServer(MockServerConfig(port=0, ttft=0.0, output_dist="fixed", output_tokens=8))
+    await server.start()
+
+    data_path = workdir / "data.jsonl"
+    data_path.write_text(json.dumps({"id": 0, "question": "1+1=?"}) + "\n", encoding="utf-8")
+    prompt_path = workdir / "prompt.txt"
+    prompt_path.write_text("问题：{question}", encoding="utf-8")
+    config_path = workdir / "config.yaml"
+    config_path.write_text(json.dumps({
+        "api": {"api_key": "mock", "base_url": f"http://127.0.0.1:{server.config.port}/v1"},
+        "model": {"model": "mock"},
+        "io": {"input_file": str(data_path), "output_dir": str(workdir / "out"), "prompt_file": str(prompt_path)},
+    }), encoding="utf-8")  # JSON 是合法的 YAML
+
+    start = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "api_tool.main", "-c", str(config_path),
+        stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        while server.stats.requests == 0:
+            if proc.returncode is not None:
+                raise RuntimeError(f"CLI exited early with code {proc.returncode}")
+            await asyncio.sleep(0.001)
+        return (time.perf_counter() - start) * 1000
+    finally:
+        await proc.wait()
+        await server.stop()
+
+
+app = typer.Typer(add_completion=False)
+
+
+@app.command()
+def main(
+    runs: int = typer.Option(5, help="Fresh-interpreter import runs."),
+    max_import_ms: float = typer.Option(0.0, help="Fail if median import time exceeds this (0 = no cap)."),
+    max_first_request_ms: float = typer.Option(0.0, help="Fail if time to first request exceeds this (0 = no cap)."),
+):
+    """
+    Measure CLI import time and time to first request.
+    """
+    import_ms, slowest, loaded = measure_import(runs)
+    print(f"⏱️  import api_tool.main: {import_ms:.1f} ms (median of {runs})")
+    print(f"📦 Heavy modules loaded at import: {loaded or 'none'}")
+    print("🐢 Slowest imports (cumulative):")
+    for us, name in slowest:
+        print(f"   {us / 1000:8.1f} ms  {name}")
+
+    with tempfile.TemporaryDirectory(prefix="api_import_") as tmp:
+        first_ms = asyncio.run(measure_first_request(Path(tmp)))
+    print(f"🚀 Time to first request: {first_ms:.1f} ms")
+
+    failed = False
+    if max_import_ms and import_ms > max_import_ms:
+        print(f"❌ Import time {import_ms:.1f} ms exceeds cap {max_import_ms:.0f} ms")
+        failed = True
+    if max_first_request_ms and first_ms > max_first_request_ms:
+        print(f"❌ Time to first request {first_ms:.1f} ms exceeds cap {max_first_request_ms:.0f} ms")
+        failed = True
+    if failed:
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
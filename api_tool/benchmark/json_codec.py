@@ -0,0 +1,98 @@
+# api_tool/benchmark/json_codec.py
+"""
+JSON 编解码微基准：代表性结果记录（长中文 + LaTeX 回答）
+
+对比标准库 json（逐行文本读取，旧实现）与 api_tool.utils.json_utils（当前后端，批量字节读取）
+的编码、解码与整文件加载吞吐。
+
+运行：
+    python -m api_tool.benchmark.json_codec --records 20000
+"""
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, List
+
+import typer
+
+from api_tool.utils import json_utils
+from api_tool.utils.io_utils import load_jsonl
+
+SNIPPETS = [
+    "首先，我们考虑函数 $f(x) = \\frac{x^2 + 1}{\\sqrt{x}}$ 的导数。",
+    "由链式法则可得 $f'(x) = \\frac{3x^2 - 1}{2x^{3/2}}$，",
+    "因此在 $x = 1$ 处取值为 $1$。",
+    "\\begin{tikzpicture}\\draw[->] (0,0) -- (2,1) node[right] {$\\vec{v}$};\\end{tikzpicture}",
+    "The reference answer matches the model's solution. ",
+    "<think>\n让我再检查一遍计算过程……\n</think>\n\n",
+    "评分：<score>5</score>\n",
+]
+
+
+def make_records(n: int, seed: int = 0) -> List[dict]:
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        response = "".join(rng.choice(SNIPPETS) for _ in range(rng.randint(20, 120)))
+        records.append({
+            "id": f"item-{i:08d}",
+            "response": response,
+            "template": "examples/qwen3_verify/qwen3_verify.txt",
+            "meta": {"len": len(response), "tags": ["math", "latex"], "score": rng.random()},
+        })
+    return records
+
+
+def _bench(label: str, fn: Callable[[], object], nbytes: int, repeat: int = 3):
+    best = min(_timed(fn) for _ in range(repeat))
+    print(f"  {label:<34} {best * 1000:9.1f} ms   {nbytes / best / 1e6:8.1f} MB/s")
+
+
+def _timed(fn: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _stdlib_load_lines(path: Path) -> List[dict]:
+    with path.open("r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+app = typer.Typer(add_completion=False)
+
+
+@app.command()
+def main(records: int = typer.Option(20000, help="Number of synthetic records.")):
+    """
+    Compare stdlib json and the configured JSON codec on representative records.
+    """
+    data = make_records(records)
+    lines_std = [json.dumps(r, ensure_ascii=False) for r in data]
+    lines_codec = [json_utils.dumps_bytes(r) for r in data]
+    nbytes = sum(len(line) for line in lines_codec)
+    print(f"🧪 {records} records, {nbytes / 1e6:.1f} MB, codec backend: {json_utils.BACKEND}")
+
+    # 输出语义一致：两种编码解析回来完全相同
+    assert all(json.loads(a) == json_utils.loads(b) for a, b in zip(lines_std[:1000], lines_codec[:1000]))
+
+    print("encode")
+    _bench("json.dumps(ensure_ascii=False)", lambda: [json.dumps(r, ensure_ascii=False) for r in data], nbytes)
+    _bench("json_utils.dumps_bytes", lambda: [json_utils.dumps_bytes(r) for r in data], nbytes)
+
+    print("decode")
+    _bench("json.loads(str)", lambda: [json.loads(s) for s in lines_std], nbytes)
+    _bench("json_utils.loads(bytes)", lambda: [json_utils.loads(b) for b in lines_codec], nbytes)
+
+    with tempfile.TemporaryDirectory(prefix="api_json_") as tmp:
+        path = Path(tmp) / "results.jsonl"
+        path.write_bytes(b"\n".join(lines_codec) + b"\n")
+        print("load file")
+        _bench("stdlib, per text line", lambda: _stdlib_load_lines(path), nbytes)
+        _bench("io_utils.load_jsonl (bulk bytes)", lambda: load_jsonl(path), nbytes)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,307 @@
+# api_tool/benchmark/mock_server.py
+"""
+本地 OpenAI 兼容 Mock 服务（仅依赖标准库 asyncio）
+
+用于在没有真实网关延迟的情况下测量客户端自身开销：
+  - 可配置 TTFT、生成速度（tokens/s）、输出长度分布、每个 chunk 的 token 数
+  - 可按比例注入 500 错误与 429 限流
+  - 支持流式（SSE）与非流式 /v1/chat/completions，GET /stats 返回服务端统计
+
+启动：
+    python -m api_tool.benchmark.mock_server --port 8765 --ttft 0.2 --tps 50
+"""
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass, asdict, field
+from typing import Dict, Optional, Tuple
+
+import typer
+
+# 混合中英文 / LaTeX 片段，接近真实评测输出
+VOCAB = [
+    "答案", "是", "正确", "因为", "所以", "我们", "可以", "得到", "。", "，",
+    " the", " answer", " is", " score", ":", " 5", "\n",
+    "$x^2$", "\\frac{1}{2}", "\\sqrt{3}", " =", " +", " (", ")",
+]
+
+
+# =========================
+# ⚙️ Mock 服务配置
+# =========================
+@dataclass
+class MockServerConfig:
+    """Mock 服务行为配置"""
+    host: str = "127.0.0.1"
+    port: int = 8765
+    ttft: float = 0.2                 # 首 token 延迟（秒）
+    tokens_per_sec: float = 50.0      # 单请求生成速度
+    output_dist: str = "normal"       # fixed / normal / uniform / exponential
+    output_tokens: int = 256          # 输出长度均值
+    output_tokens_std: int = 64       # normal 分布标准差；uniform 为半宽
+    chunk_tokens: int = 1             # 每个 SSE chunk 包含的 token 数
+    error_rate: float = 0.0           # 注入 500 的概率
+    rate_limit_rate: float = 0.0      # 注入 429 的概率
+    seed: Optional[int] = None
+
+
+@dataclass
+class MockServerStats:
+    """服务端计数"""
+    requests: int = 0
+    completed: int = 0
+    cancelled: int = 0
+    errors_injected: int = 0
+    rate_limited: int = 0
+    truncated: int = 0
+    tokens_sent: int = 0
+    bytes_received: int = 0
+    active: int = 0
+    started_at: float = field(default_factory=time.time)
+
+
+class MockOpenAIServer:
+    """最小化的 HTTP/1.1 服务，实现 chat.completions 的流式与非流式接口"""
+
+    def __init__(self, config: MockServerConfig):
+        self.config = config
+        self.stats = MockServerStats()
+        self.rng = random.Random(config.seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        # 活跃连接（keep-alive）：stop() 时主动关闭
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    # ---------- 生命周期 ----------
+    async def start(self):
+        self._server = await asyncio.start_server(
+            self._handle_connection, self.config.host, self.config.port, backlog=4096
+        )
+        # port=0 时回填实际端口
+        self.config.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        print(f"🧪 Mock OpenAI server listening on http://{self.config.host}:{self.config.port}/v1")
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+        for task, writer in list(self._connections.items()):
+            writer.close()
+            task.cancel()
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+
+    # ---------- 采样 ----------
+    def sample_output_tokens(self) -> int:
+        cfg = self.config
+        if cfg.output_dist == "fixed":
+            n = cfg.output_tokens
+        elif cfg.output_dist == "uniform":
+            n = self.rng.randint(cfg.output_tokens - cfg.output_tokens_std, cfg.output_tokens + cfg.output_tokens_std)
+        elif cfg.output_dist == "exponential":
+            n = int(self.rng.expovariate(1.0 / max(1, cfg.output_tokens)))
+        else:
+            n = int(self.rng.gauss(cfg.output_tokens, cfg.output_tokens_std))
+        return max(1, n)
+
+    # ---------- HTTP ----------
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections[task] = writer
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._dispatch(method, path, body, writer)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # stop() 关闭服务时取消空闲的 keep-alive 连接，正常结束即可
+            pass
+        finally:
+            self._connections.pop(task, None)
+            writer.close()
+
+    async def _read_request(self, reader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        lines = head.decode("latin-1").split("\r\n")
+        method, path, _ = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                k, v = line.split(":", 1)
+                headers[k.strip().lower()] = v.strip()
+        length = int(headers.get("content-length", 0))
+        body = await reader.readexactly(length) if length else b""
+        self.stats.bytes_received += len(head) + length
+        return method, path, headers, body
+
+    async def _dispatch(self, method: str, path: str, body: bytes, writer):
+        if method == "POST" and path.rstrip("/").endswith("/chat/completions"):
+            await self._chat_completions(json.loads(body or b"{}"), writer)
+        elif method == "GET" and path.rstrip("/").endswith("/models"):
+            await self._send_json(writer, 200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+        elif method == "GET" and path.rstrip("/").endswith("/stats"):
+            await self._send_json(writer, 200, asdict(self.stats))
+        else:
+            await self._send_json(writer, 404, {"error": {"message": f"Not found: {path}"}})
+
+    async def _send_json(self, writer, status: int, payload: dict, extra_headers: str = ""):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        reason = {200: "OK", 404: "Not Found", 429: "Too Many Requests", 500: "Internal Server Error"}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n{extra_headers}\r\n".encode("latin-1") + data
+        )
+        await writer.drain()
+
+    # ---------- chat.completions ----------
+    async def _chat_completions(self, payload: dict, writer):
+        cfg = self.config
+        self.stats.requests += 1
+
+        # 错误注入
+        roll = self.rng.random()
+        if roll < cfg.rate_limit_rate:
+            self.stats.rate_limited += 1
+            await self._send_json(
+                writer, 429, {"error": {"message": "Rate limit exceeded (mock)", "type": "rate_limit"}},
+                extra_headers="Retry-After: 1\r\n",
+            )
+            return
+        if roll < cfg.rate_limit_rate + cfg.error_rate:
+            self.stats.errors_injected += 1
+            await self._send_json(writer, 500, {"error": {"message": "Injected server error (mock)"}})
+            return
+
+        max_tokens = payload.get("max_tokens")
+        n_tokens = self.sample_output_tokens()
+        finish_reason = "stop"
+        if max_tokens and n_tokens > max_tokens:
+            n_tokens, finish_reason = max_tokens, "length"
+            self.stats.truncated += 1
+
+        model = payload.get("model", "mock")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        tokens = [VOCAB[self.rng.randrange(len(VOCAB))] for _ in range(n_tokens)]
+
+        self.stats.active += 1
+        try:
+            if payload.get("stream"):
+                await self._stream(writer, tokens, finish_reason, model, completion_id, created)
+            else:
+                await asyncio.sleep(cfg.ttft + n_tokens / cfg.tokens_per_sec)
+                await self._send_json(writer, 200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "".join(tokens)},
+                        "finish_reason": finish_reason,
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": n_tokens, "total_tokens": n_tokens},
+                })
+                self.stats.tokens_sent += n_tokens
+            self.stats.completed += 1
+        except ConnectionError:
+            # 客户端提前断开 = 服务端请求被取消
+            self.stats.cancelled += 1
+            raise
+        finally:
+            self.stats.active -= 1
+
+    async def _stream(self, writer, tokens, finish_reason, model, completion_id, created):
+        cfg = self.config
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Transfer-Encoding: chunked\r\n\r\n"
+        )
+
+        def event(delta: dict, finish: Optional[str] = None) -> bytes:
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            }
+            data = f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+            return f"{len(data):x}\r\n".encode("latin-1") + data + b"\r\n"
+
+        # 以绝对时间为节拍，避免 sleep 误差累积
+        start = time.monotonic()
+        step = max(1, cfg.chunk_tokens)
+        interval = step / cfg.tokens_per_sec
+        await asyncio.sleep(cfg.ttft)
+        writer.write(event({"role": "assistant", "content": ""}))
+        for i in range(0, len(tokens), step):
+            target = start + cfg.ttft + (i // step + 1) * interval
+            delay = target - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            piece = tokens[i:i + step]
+            writer.write(event({"content": "".join(piece)}))
+            await writer.drain()
+            self.stats.tokens_sent += len(piece)
+
+        done = b"data: [DONE]\n\n"
+        writer.write(event({}, finish_reason))
+        writer.write(f"{len(done):x}\r\n".encode("latin-1") + done + b"\r\n" + b"0\r\n\r\n")
+        await writer.drain()
+
+
+app = typer.Typer(add_completion=False)
+
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", help="Bind address."),
+    port: int = typer.Option(8765, help="Bind port (0 = random)."),
+    ttft: float = typer.Option(0.2, help="Time to first token, seconds."),
+    tps: float = typer.Option(50.0, "--tps", help="Tokens per second per request."),
+    output_dist: str = typer.Option("normal", help="fixed / normal / uniform / exponential."),
+    output_tokens: int = typer.Option(256, help="Mean output length in tokens."),
+    output_tokens_std: int = typer.Option(64, help="Std (normal) or half-width (uniform)."),
+    chunk_tokens: int = typer.Option(1, help="Tokens per SSE chunk."),
+    error_rate: float = typer.Option(0.0, help="Probability of an injected HTTP 500."),
+    rate_limit_rate: float = typer.Option(0.0, help="Probability of an injected HTTP 429."),
+    seed: Optional[int] = typer.Option(None, help="Random seed."),
+):
+    """
+    Run a local OpenAI-compatible mock server.
+    """
+    config = MockServerConfig(
+        host=host, port=port, ttft=ttft, tokens_per_sec=tps, output_dist=output_dist,
+        output_tokens=output_tokens, output_tokens_std=output_tokens_std, chunk_tokens=chunk_tokens,
+        error_rate=error_rate, rate_limit_rate=rate_limit_rate, seed=seed,
+    )
+    try:
+        asyncio.run(MockOpenAIServer(config).serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    app()
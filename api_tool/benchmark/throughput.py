@@ -0,0 +1,272 @@
+# api_tool/benchmark/throughput.py
+"""
+客户端吞吐基准：用 LLMEvaluator 压测本地 Mock 服务
+
+每个 (数据集类型, 并发) 组合在独立子进程中运行，统计：
+  - 客户端 requests/sec
+  - 每请求 CPU 时间（user + sys）
+  - 事件循环延迟（p50 / p99 / max）
+  - 峰值 RSS
+
+运行：
+    python -m api_tool.benchmark.throughput --concurrency 10,100,1000 --kinds text,image
+结果写入 --output 指定的 JSON 文件，可作为回归基线。
+"""
+import asyncio
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from api_tool.config import APIConfig, AppConfig, ConcurrencyConfig, IOConfig, ModelConfig
+
+console = Console()
+
+PROMPTS = {
+    "text": "请阅读问题并回答：\n问题：\n{question}",
+    "image": "{image}请阅读图片中的问题并回答：\n问题：\n{question}",
+}
+
+
+# =========================
+# 📦 合成数据
+# =========================
+def make_dataset(kind: str, n_items: int, workdir: Path) -> Path:
+    """生成 text / image 合成数据集，返回 JSONL 路径"""
+    data_path = workdir / f"{kind}_{n_items}.jsonl"
+    image_paths: List[str] = []
+    if kind == "image":
+        from PIL import Image, ImageDraw
+
+        # 少量不同尺寸的 PNG 循环复用（覆盖缩放与不缩放两种路径）
+        for i, size in enumerate([(512, 384), (1024, 768), (1600, 1200), (300, 900)]):
+            img = Image.new("RGB", size, "white")
+            draw = ImageDraw.Draw(img)
+            for x in range(0, size[0], 40):
+                draw.line([(x, 0), (size[0] - x, size[1])], fill=(x % 255, 80, 160), width=2)
+            path = workdir / f"img_{i}.png"
+            img.save(path)
+            image_paths.append(str(path))
+
+    question = "已知 $f(x)=x^2+\\frac{1}{2}x$，求 $f'(1)$ 的值，并说明理由。" * 4
+    with data_path.open("w", encoding="utf-8") as f:
+        for i in range(n_items):
+            item = {"id": i, "question": question}
+            if kind == "image":
+                item["image"] = image_paths[i % len(image_paths)]
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    return data_path
+
+
+# =========================
+# 📏 单次测量（子进程内执行）
+# =========================
+async def _sample_loop_lag(samples: List[float], interval: float = 0.01):
+    """周期性 sleep，记录实际唤醒延迟"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, loop.time() - start - interval))
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+async def _warm_up(evaluator, n: int):
+    """计时前先发几个请求：完成 SDK 首次使用的延迟初始化并建立连接，不计入指标"""
+    async def one():
+        stream = await evaluator.client.chat.completions.create(
+            model=evaluator.model_name,
+            messages=[{"role": "user", "content": "warm-up"}],
+            stream=True,
+            max_tokens=8,
+        )
+        async for _ in stream:
+            pass
+
+    await asyncio.gather(*(one() for _ in range(n)))
+
+
+async def _measure(config: AppConfig) -> Dict[str, float]:
+    from api_tool.evaluator.llm_evaluator import LLMEvaluator
+
+    evaluator = LLMEvaluator(config)
+    await _warm_up(evaluator, min(8, config.concurrency.concurrency))
+
+    lag_samples: List[float] = []
+    lag_task = asyncio.create_task(_sample_loop_lag(lag_samples))
+
+    ru_start = resource.getrusage(resource.RUSAGE_SELF)
+    wall_start = time.perf_counter()
+    await evaluator.run()
+    wall = time.perf_counter() - wall_start
+    ru_end = resource.getrusage(resource.RUSAGE_SELF)
+    lag_task.cancel()
+
+    success = evaluator.total_requests_success
+    cpu = (ru_end.ru_utime - ru_start.ru_utime) + (ru_end.ru_stime - ru_start.ru_stime)
+    return {
+        "requests": evaluator.total_requests_sent,
+        "success": success,
+        "wall_s": round(wall, 3),
+        "rps": round(success / wall, 2) if wall > 0 else 0.0,
+        "cpu_ms_per_req": round(1000 * cpu / max(1, success), 3),
+        "loop_lag_p50_ms": round(1000 * _percentile(lag_samples, 0.50), 3),
+        "loop_lag_p99_ms": round(1000 * _percentile(lag_samples, 0.99), 3),
+        "loop_lag_max_ms": round(1000 * max(lag_samples, default=0.0), 3),
+        # Linux 下 ru_maxrss 单位为 KB
+        "peak_rss_mb": round(ru_end.ru_maxrss / 1024, 1),
+    }
+
+
+def run_client(base_url: str, kind: str, concurrency: int, n_items: int, workdir: Path) -> Dict[str, float]:
+    """在当前进程内跑一次 LLMEvaluator 并返回指标"""
+    data_path = make_dataset(kind, n_items, workdir)
+    prompt_path = workdir / f"{kind}.txt"
+    prompt_path.write_text(PROMPTS[kind], encoding="utf-8")
+
+    config = AppConfig(
+        api=APIConfig(api_key="mock", base_url=base_url),
+        model=ModelConfig(model="mock", temperature=0.0, top_p=1.0, max_tokens=4096),
+        concurrency=ConcurrencyConfig(concurrency=concurrency, timeout=600),
+        io=IOConfig(
+            input_file=str(data_path),
+            output_dir=str(workdir / f"out_{kind}_{concurrency}"),
+            prompt_file=str(prompt_path),
+        ),
+    )
+    return asyncio.run(_measure(config))
+
+
+# =========================
+# 🚦 Mock 服务子进程
+# =========================
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_mock_server(args: List[str]) -> "tuple[subprocess.Popen, str]":
+    port = _free_port()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "api_tool.benchmark.mock_server", "--port", str(port), *args],
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc, f"http://127.0.0.1:{port}/v1"
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("Mock server failed to start")
+
+
+app = typer.Typer(add_completion=False)
+
+
+@app.command()
+def main(
+    concurrency: str = typer.Option("10,100,1000", help="Comma-separated concurrency levels."),
+    kinds: str = typer.Option("text,image", help="Comma-separated dataset kinds: text, image."),
+    items: int = typer.Option(0, help="Items per run (0 = max(200, 5 x concurrency))."),
+    output: str = typer.Option("bench_results.json", help="Where to write the JSON results."),
+    server_url: Optional[str] = typer.Option(None, help="Use an already running server instead of spawning one."),
+    ttft: float = typer.Option(0.2, help="Mock server TTFT, seconds."),
+    tps: float = typer.Option(50.0, "--tps", help="Mock server tokens/sec per request."),
+    output_tokens: int = typer.Option(256, help="Mock server mean output tokens."),
+    chunk_tokens: int = typer.Option(1, help="Mock server tokens per SSE chunk."),
+    error_rate: float = typer.Option(0.0, help="Mock server HTTP 500 probability."),
+    rate_limit_rate: float = typer.Option(0.0, help="Mock server HTTP 429 probability."),
+    client: bool = typer.Option(False, "--client", hidden=True),
+    kind: str = typer.Option("text", hidden=True),
+    workdir: Optional[str] = typer.Option(None, hidden=True),
+):
+    """
+    Benchmark LLMEvaluator against the local mock server.
+    """
+    # 子进程模式：只跑一组并把指标 JSON 输出到 stdout 最后一行
+    if client:
+        n = int(concurrency)
+        # 屏蔽评估器自身的进度输出
+        with open(os.devnull, "w") as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                metrics = run_client(server_url, kind, n, items, Path(workdir))
+            finally:
+                sys.stdout = stdout
+        print(json.dumps(metrics))
+        return
+
+    levels = [int(x) for x in concurrency.split(",") if x.strip()]
+    kind_list = [k.strip() for k in kinds.split(",") if k.strip()]
+
+    proc = None
+    if server_url is None:
+        proc, server_url = start_mock_server([
+            "--ttft", str(ttft), "--tps", str(tps), "--output-tokens", str(output_tokens),
+            "--chunk-tokens", str(chunk_tokens), "--error-rate", str(error_rate),
+            "--rate-limit-rate", str(rate_limit_rate),
+        ])
+
+    results = []
+    try:
+        for k in kind_list:
+            for level in levels:
+                n_items = items or max(200, 5 * level)
+                with tempfile.TemporaryDirectory(prefix="api_bench_") as tmp:
+                    out = subprocess.run(
+                        [sys.executable, "-m", "api_tool.benchmark.throughput", "--client",
+                         "--server-url", server_url, "--kind", k, "--concurrency", str(level),
+                         "--items", str(n_items), "--workdir", tmp],
+                        capture_output=True, text=True,
+                    )
+                if out.returncode != 0:
+                    console.print(f"[red]❌ {k} @ {level} failed:[/red]\n{out.stderr[-2000:]}")
+                    continue
+                metrics = json.loads(out.stdout.strip().splitlines()[-1])
+                metrics.update({"kind": k, "concurrency": level, "items": n_items})
+                results.append(metrics)
+                console.print(f"[green]✅ {k} @ {level}: {metrics['rps']} req/s[/green]")
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    table = Table(title="Client throughput")
+    columns = ["kind", "concurrency", "success", "rps", "cpu_ms_per_req",
+               "loop_lag_p99_ms", "loop_lag_max_ms", "peak_rss_mb"]
+    for c in columns:
+        table.add_column(c)
+    for r in results:
+        table.add_row(*[str(r[c]) for c in columns])
+    console.print(table)
+
+    Path(output).write_text(json.dumps({
+        "server": {"ttft": ttft, "tps": tps, "output_tokens": output_tokens, "chunk_tokens": chunk_tokens,
+                   "error_rate": error_rate, "rate_limit_rate": rate_limit_rate},
+        "python": sys.version.split()[0],
+        "results": results,
+    }, indent=2, ensure_ascii=False), encoding="utf-8")
+    console.print(f"[bold blue]📊 Results saved to {output}[/bold blue]")
+
+
+if __name__ == "__main__":
+    app()
@@ -1,9 +1,10 @@
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
 import yaml
-from openai import AsyncOpenAI
-import httpx
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 
 # =========================
@@ -15,8 +16,12 @@ class APIConfig:
     api_key: str
     base_url: Optional[str] = None
 
-    def get_openai_client(self, timeout: int = 120) -> AsyncOpenAI:
+    def get_openai_client(self, timeout: int = 120) -> "AsyncOpenAI":
         """返回异步 OpenAI 客户端实例（兼容内部与外部 API）"""
+        # openai / httpx 导入较慢，仅在创建客户端时导入
+        from openai import AsyncOpenAI
+        import httpx
+
         if not self.api_key:
             raise ValueError("Missing api_key in APIConfig")
 
@@ -63,6 +68,14 @@ class ModelConfig:
     max_tokens: int = 1024
     stream: bool = True
     thinking: bool = False
+    # 被 max_tokens 截断（finish_reason == "length"）时的续写策略
+    continue_on_truncation: bool = False
+    max_continuations: int = 1
+    continuation_max_tokens: Optional[int] = None   # 续写请求的 max_tokens，默认 2 × max_tokens
+    # 让服务端把最后一条 assistant 消息当作前缀续写（vLLM / SGLang 参数）
+    continuation_extra_body: Dict[str, Any] = field(
+        default_factory=lambda: {"continue_final_message": True, "add_generation_prompt": False}
+    )
 
 
 # =========================
@@ -75,6 +88,72 @@ class IOConfig:
     output_dir: str
     prompt_file: Optional[str] = None
     key_name: str = "id"  # 新增唯一主键字段
+    retry_truncated: bool = False  # 断点续跑时把 status == "truncated" 的记录视为未完成，重新请求（旧记录仍计入分数聚合）
+
+
+# =========================
+# 🖼️ 图像传输配置
+# =========================
+@dataclass
+class ImageConfig:
+    """图像编码与传输策略"""
+    format: str = "jpeg"                  # 重新编码格式：jpeg / webp / png
+    quality: int = 90
+    min_quality: int = 50                 # 自适应质量下限
+    max_bytes: Optional[int] = None       # 单图字节预算（编码后），超出则降质量 / 缩小
+    min_side: int = 32
+    max_side: int = 768
+    passthrough: bool = False             # 源图格式与 format 不同但满足约束时也不重新编码（默认重新编码）
+    transport: str = "base64"             # base64：内联 Data URL；url：本地静态文件服务
+    serve_dir: Optional[str] = None       # url 模式图片目录，默认 <output_dir>/images
+    serve_host: str = "0.0.0.0"
+    serve_port: int = 0                   # 0 为随机端口
+    public_url: Optional[str] = None      # 网关访问图片的地址前缀，默认 http://<本机IP>:<端口>
+
+
+# =========================
+# ✂️ 提前终止配置
+# =========================
+@dataclass
+class StopConfig:
+    """流式提前终止条件，任一命中即关闭流并取消服务端请求"""
+    regex: Optional[str] = None           # 如 "<score>\\s*\\d+\\s*</score>"
+    json_object: bool = False             # 第一个合法的顶层 JSON 对象闭合即停止
+    stop_sequences: List[str] = field(default_factory=list)
+    skip_think: bool = True               # 只在 </think> 之后判定（无 </think> 则不提前终止，非思考模型设为 false）
+    regex_window: int = 512               # 正则增量回看窗口（字符）
+
+
+# =========================
+# 🗂️ 工作账本配置
+# =========================
+@dataclass
+class LedgerConfig:
+    """SQLite 工作账本：多进程 / 多节点动态领取任务，替代按结果文件去重的断点续跑"""
+    enabled: bool = False
+    path: Optional[str] = None            # 默认 <output_dir>/ledger.sqlite
+    lease_seconds: float = 600            # 租约时长，进程崩溃后过期回收
+    batch_size: int = 0                   # 每次租用条目数，0 表示与并发数相同
+    max_attempts: int = 3                 # 超过后标记为 failed
+    retry_backoff: float = 30.0           # 失败后重新领取前的等待（秒），每次失败翻倍
+    retry_failed: bool = False            # 启动时把 failed 条目重新置为 pending（清零尝试次数）
+    poll_interval: float = 10.0           # 其他节点仍持有租约时的轮询间隔（秒）
+
+
+# =========================
+# 📈 分数提取与在线聚合配置
+# =========================
+@dataclass
+class ScoreConfig:
+    """写入结果时提取得分 / 判定，并按 (template, model) 在线聚合"""
+    patterns: List[str] = field(default_factory=list)  # 正则，取第 1 个捕获组，如 "<score>\\s*([\\d.]+)"
+    json_path: Optional[str] = None       # 回复中 JSON 对象的点分路径，如 "result.score"
+    match: str = "last"                   # 正则多次命中时取 first / last
+    skip_think: bool = True               # 只在 </think> 之后提取
+    field: str = "score"                  # 写入结果记录的字段名
+    bins: int = 10                        # 直方图分桶
+    hist_min: float = 0.0
+    hist_max: float = 10.0
 
 
 # =========================
@@ -86,6 +165,10 @@ class AppConfig:
     model: ModelConfig
     concurrency: ConcurrencyConfig
     io: IOConfig
+    stop: StopConfig = field(default_factory=StopConfig)
+    image: ImageConfig = field(default_factory=ImageConfig)
+    ledger: LedgerConfig = field(default_factory=LedgerConfig)
+    score: ScoreConfig = field(default_factory=ScoreConfig)
 
     @staticmethod
     def load(path: str) -> "AppConfig":
@@ -100,12 +183,20 @@ class AppConfig:
         model_cfg = ModelConfig(**data["model"])
         concurrency_cfg = ConcurrencyConfig(**data.get("concurrency", {}))
         io_cfg = IOConfig(**data["io"])
+        stop_cfg = StopConfig(**(data.get("stop") or {}))
+        image_cfg = ImageConfig(**(data.get("image") or {}))
+        ledger_cfg = LedgerConfig(**(data.get("ledger") or {}))
+        score_cfg = ScoreConfig(**(data.get("score") or {}))
 
         return AppConfig(
             api=api_cfg,
             model=model_cfg,
             concurrency=concurrency_cfg,
-            io=io_cfg
+            io=io_cfg,
+            stop=stop_cfg,
+            image=image_cfg,
+            ledger=ledger_cfg,
+            score=score_cfg,
         )
 
 
@@ -1,18 +1,23 @@
 import re
 from pathlib import Path
 from typing import Dict, Any, Tuple
-from api_tool.utils.image_utils import encode_image_to_base64
+from api_tool.utils.image_utils import encode_image, encode_image_to_base64
+from api_tool.utils.image_server import ImageServer
 from api_tool.utils.prompt_utils import fill_prompt
 from api_tool.evaluator.base import BaseEvaluator
 from api_tool.evaluator.stream_handler import StreamHandler
 from api_tool.utils.token_utils import count_tokens
-from api_tool.utils.io_utils import load_dataset_skip_existing, append_jsonl
+from api_tool.utils.io_utils import load_dataset, load_dataset_skip_existing, append_jsonl
+from api_tool.utils.ledger import FAILED, TRUNCATED, WorkLedger
+from api_tool.utils.score_utils import OnlineAggregator, ScoreExtractor
+from api_tool.utils.json_utils import iter_jsonl_lines, loads
 from api_tool.utils.progress_utils import create_progress_bar
 from rich.console import Console
 import asyncio
+import time
 import traceback
 from queue import Queue
-import json
+from api_tool.utils.json_utils import dumps, dumps_bytes
 
 console = Console(force_terminal=True)
 
@@ -40,17 +45,62 @@ class LLMEvaluator(BaseEvaluator):
         self.stream = config.model.stream
         self.thinking = config.model.thinking
 
+        # 图像传输策略（url 模式下在 run() 中启动静态文件服务）
+        self.image_config = config.image
+        self.image_server = None
+
+        # 工作账本（ledger.enabled 时在 run() 中打开）
+        self.ledger = None
+
+        # 分数提取与在线聚合（配置了 score.patterns / score.json_path 时启用）
+        self.score_extractor = ScoreExtractor.from_config(config.score)
+        self.aggregator = None
+        self.aggregates_file = self.output_dir / "aggregates.json"
+        self._last_persist = 0.0
+
         # 请求计数
         self.current_requests = 0
         self.total_requests_sent = 0
         self.total_requests_success = 0
+        self.total_early_stopped = 0
+        self.total_bytes_sent = 0
+        # 截断统计：首轮即被 max_tokens 截断 / 续写后仍截断 / 发生续写
+        self.total_truncated_first = 0
+        self.total_truncated = 0
+        self.total_continued = 0
 
     async def run(self):
-        dataset = load_dataset_skip_existing(self.config.io.input_file, self.config.io.output_dir, self.config.io.key_name)
+        ledger_cfg = self.config.ledger
+        if ledger_cfg.enabled:
+            # 账本模式：断点续跑由账本决定，不再扫描 results.jsonl
+            dataset = load_dataset(self.config.io.input_file)
+            self.ledger = WorkLedger(
+                ledger_cfg.path or self.output_dir / "ledger.sqlite",
+                lease_seconds=ledger_cfg.lease_seconds,
+                max_attempts=ledger_cfg.max_attempts,
+                retry_backoff=ledger_cfg.retry_backoff,
+            )
+        else:
+            dataset = load_dataset_skip_existing(
+                self.config.io.input_file, self.config.io.output_dir, self.config.io.key_name,
+                retry_truncated=self.config.io.retry_truncated,
+            )
         if not dataset:
             console.print("[yellow]⚠️ No data loaded. Check your input_file path.[/yellow]")
             return
 
+        if self.score_extractor is not None:
+            self._init_aggregator()
+
+        if self.image_config.transport == "url":
+            self.image_server = ImageServer(
+                self.image_config.serve_dir or str(self.output_dir / "images"),
+                host=self.image_config.serve_host,
+                port=self.image_config.serve_port,
+                public_url=self.image_config.public_url,
+            )
+            self.image_server.start()
+
         self.prompt_template = Path(self.config.io.prompt_file).read_text(encoding="utf-8")
         first_item = dataset[0]
         messages, prompt = self.build_messages(first_item, self.prompt_template)
@@ -79,58 +129,242 @@ class LLMEvaluator(BaseEvaluator):
                     item = await result_queue.get()
                     if item is None:
                         break
-                    f.write(json.dumps(item, ensure_ascii=False) + "\n")
+                    f.write(dumps(item) + "\n")
                     f.flush()
                     result_queue.task_done()
 
         # writer_task = asyncio.create_task(writer())
 
-        async def process_item(item):
-            async with sem:
-                self.current_requests += 1
-                self.total_requests_sent += 1
-                try:
-
-                    messages, prompt = self.build_messages(item, self.prompt_template)
-
-                    success, response_text = await self._call_model(messages)
-                    if not success:
-                        console.print(f"[yellow]⚠️ Skipped due to error: {response_text}[/yellow]")
-                        return None
-                        
-                    key_name = self.config.io.key_name
-                    result = {
-                        key_name: item[key_name],
-                        # "prompt": prompt,
-                        "response": response_text,
-                        "template": self.config.io.prompt_file,
-                    }
-                    # if not "10.140." in self.config.api.base_url:
-                    #     result["token_usage"] = count_tokens(messages, self.model_name)
-
-                    self.total_requests_success += 1
-                    return result
-                except Exception as e:
-                    console.print(f"[red]Error processing item {item.get('id')}: {e}[/red]")
-                    console.print(f"[dim]{traceback.format_exc()}[/dim]")
-                    return None
-                finally:
-                    self.current_requests -= 1
-
-        with progress:
-            tasks = [process_item(item) for item in dataset]
-            for coro in asyncio.as_completed(tasks):
-                res = await coro
-                progress.update(overall_task, advance=1)
-                if res:
-                    # await result_queue.put(res)
-                    results.append(res)
-                    append_jsonl(res, self.output_file)
+        try:
+            with progress:
+                if self.ledger is not None:
+                    await self._run_with_ledger(dataset, sem, progress, overall_task)
+                else:
+                    tasks = [self._process_item(item, sem) for item in dataset]
+                    for coro in asyncio.as_completed(tasks):
+                        res = await coro
+                        progress.update(overall_task, advance=1)
+                        if res:
+                            # await result_queue.put(res)
+                            results.append(res)
+                            self._write_result(res)
+        finally:
+            # 中断（Ctrl-C / 取消）时也落盘聚合结果；账本模式无法从 results.jsonl 补扫
+            if self.image_server is not None:
+                self.image_server.stop()
+            if self.aggregator is not None:
+                self._persist_aggregates()
 
         # await result_queue.put(None)
         # await writer_task
+        if self.aggregator is not None:
+            console.print(f"[cyan]📈 Score aggregates ({self.aggregates_file}):[/cyan]")
+            for line in self.aggregator.summary_lines():
+                console.print(f"[cyan]   {line}[/cyan]")
+        if self.ledger is not None:
+            counts = self.ledger.counts()
+            console.print(f"[cyan]🗂️ Ledger: {counts}[/cyan]")
+            self.ledger.close()
+        if self.total_requests_sent:
+            console.print(f"[cyan]📦 Avg request size: {self.total_bytes_sent / self.total_requests_sent / 1024:.1f} KB[/cyan]")
+        if self.total_requests_success:
+            console.print(
+                f"[cyan]📏 Truncation rate (max_tokens={self.max_tokens}): "
+                f"{self.total_truncated_first / self.total_requests_success:.1%} first pass, "
+                f"{self.total_truncated / self.total_requests_success:.1%} final "
+                f"({self.total_continued} continued)[/cyan]"
+            )
+        if self.total_early_stopped:
+            console.print(f"[cyan]✂️ Early-stopped streams: {self.total_early_stopped}/{self.total_requests_success}[/cyan]")
         console.print(f"[bold blue]✅ Evaluation completed. Results saved to {self.output_file}[/bold blue]")
 
+    async def _process_item(self, item: Dict[str, Any], sem: asyncio.Semaphore):
+        """处理单条数据，成功返回结果记录，失败返回 None"""
+        async with sem:
+            self.current_requests += 1
+            self.total_requests_sent += 1
+            try:
+
+                messages, prompt = self.build_messages(item, self.prompt_template)
+                request_bytes = len(dumps_bytes(messages))
+                self.total_bytes_sent += request_bytes
+
+                success, output = await self._call_model(messages)
+                if not success:
+                    console.print(f"[yellow]⚠️ Skipped due to error: {output['error']}[/yellow]")
+                    return None
+                    
+                key_name = self.config.io.key_name
+                result = {
+                    key_name: item[key_name],
+                    # "prompt": prompt,
+                    "response": output.get("response", ""),
+                    "template": self.config.io.prompt_file,
+                    "request_bytes": request_bytes,
+                    "status": "truncated" if output.get("truncated") else "ok",
+                }
+                if output.get("continuations"):
+                    result["continuations"] = output["continuations"]
+                    self.total_continued += 1
+                if output.get("truncated_first"):
+                    self.total_truncated_first += 1
+                if output.get("truncated"):
+                    self.total_truncated += 1
+                if "stop_reason" in output:
+                    result["stop_reason"] = output["stop_reason"]
+                    self.total_early_stopped += 1
+                if output.get("continuation_error"):
+                    result["continuation_error"] = output["continuation_error"]
+                # if not "10.140." in self.config.api.base_url:
+                #     result["token_usage"] = count_tokens(messages, self.model_name)
+
+                self.total_requests_success += 1
+                return result
+            except Exception as e:
+                console.print(f"[red]Error processing item {item.get('id')}: {e}[/red]")
+                console.print(f"[dim]{traceback.format_exc()}[/dim]")
+                return None
+            finally:
+                self.current_requests -= 1
+
+    def _init_aggregator(self):
+        """
+        加载已持久化的聚合结果并补扫其后新增的记录：
+        - 普通模式：从 results_offset 开始补扫 results.jsonl 尾部（首次启用时全量扫描一次）；
+          results.jsonl 被删除或截短到 results_offset 之前时，丢弃已持久化的聚合并全量重扫
+        - 账本模式：多个进程共用 results.jsonl，每个进程单独写 aggregates.<worker>.json，汇总时合并
+        """
+        score_cfg = self.config.score
+        if self.ledger is not None:
+            worker = re.sub(r"[^\w.-]", "_", self.ledger.worker_id)
+            self.aggregates_file = self.output_dir / f"aggregates.{worker}.json"
+            self.aggregator = OnlineAggregator(score_cfg)
+            return
+
+        results_size = self.output_file.stat().st_size if self.output_file.exists() else 0
+        if self.aggregates_file.exists():
+            self.aggregator = OnlineAggregator.load(self.aggregates_file, score_cfg)
+            if results_size < self.aggregator.results_offset:
+                console.print(f"[yellow]⚠️ {self.output_file} is smaller than when aggregated, rebuilding aggregates[/yellow]")
+                self.aggregator = OnlineAggregator(score_cfg)
+        else:
+            self.aggregator = OnlineAggregator(score_cfg)
+        if results_size > self.aggregator.results_offset:
+            caught_up = 0
+            for line in iter_jsonl_lines(self.output_file, offset=self.aggregator.results_offset):
+                record = loads(line)
+                value = record.get(score_cfg.field) if score_cfg.field in record \
+                    else self.score_extractor.extract(record.get("response", ""))
+                self.aggregator.add(
+                    OnlineAggregator.group_key(record.get("template"), self.model_name), value,
+                    truncated=record.get("status") == "truncated",
+                )
+                caught_up += 1
+            console.print(f"[cyan]📈 Aggregated {caught_up} existing results into {self.aggregates_file}[/cyan]")
+            self._persist_aggregates()
+
+    def _write_result(self, result: Dict[str, Any]):
+        """写入一条结果；启用分数提取时同时提取分数并更新在线聚合"""
+        if self.aggregator is not None:
+            value = self.score_extractor.extract(result.get("response", ""))
+            result[self.config.score.field] = value
+            self.aggregator.add(
+                OnlineAggregator.group_key(result.get("template"), self.model_name), value,
+                truncated=result.get("status") == "truncated",
+            )
+        append_jsonl(result, self.output_file)
+        if self.aggregator is not None and time.monotonic() - self._last_persist >= self.config.concurrency.write_interval:
+            self._persist_aggregates()
+
+    def _persist_aggregates(self):
+        if self.ledger is None and self.output_file.exists():
+            self.aggregator.results_offset = self.output_file.stat().st_size
+        self.aggregator.save(self.aggregates_file)
+        self._last_persist = time.monotonic()
+
+    async def _run_with_ledger(self, dataset, sem, progress, overall_task):
+        """
+        账本模式主循环：
+        - 并发槽位有空闲时按批次租用 pending 条目（不超过空闲槽位数）
+        - 完成 / 失败的条目按批写回账本
+        - 本进程无可领取条目时，等待其他进程的租约完成或过期，以及失败条目的退避结束
+        全表统计 counts() 只在启动和空闲轮询时查询，进度条平时按本进程完成数推进。
+        """
+        ledger_cfg = self.config.ledger
+        key_name = self.config.io.key_name
+        items = {str(item[key_name]): item for item in dataset if key_name in item}
+        added = await asyncio.to_thread(self.ledger.seed, items.keys())
+        console.print(f"[cyan]🗂️ Ledger {self.ledger.path} (worker {self.ledger.worker_id}), {added} new items[/cyan]")
+        if self.config.io.retry_truncated:
+            requeued = await asyncio.to_thread(self.ledger.requeue, TRUNCATED)
+            console.print(f"[cyan]🗂️ Requeued {requeued} truncated items[/cyan]")
+        if ledger_cfg.retry_failed:
+            requeued = await asyncio.to_thread(self.ledger.requeue, FAILED)
+            console.print(f"[cyan]🗂️ Requeued {requeued} failed items[/cyan]")
+
+        batch_size = ledger_cfg.batch_size or self.concurrent_limit
+        in_flight: Dict[asyncio.Task, str] = {}
+        counts = await asyncio.to_thread(self.ledger.counts)
+        progress.update(overall_task, completed=counts["done"] + counts["failed"] + counts["truncated"])
+
+        async def handle(key):
+            return key, await self._process_item(items[key], sem)
+
+        async def renew_leases():
+            while True:
+                await asyncio.sleep(ledger_cfg.lease_seconds / 3)
+                if in_flight:
+                    await asyncio.to_thread(self.ledger.renew, list(in_flight.values()))
+
+        renew_task = asyncio.create_task(renew_leases())
+        try:
+            while True:
+                free = self.concurrent_limit - len(in_flight)
+                if free > 0:
+                    keys = await asyncio.to_thread(self.ledger.lease, min(batch_size, free))
+
+                    missing = [k for k in keys if k not in items]
+                    if missing:
+                        await asyncio.to_thread(self.ledger.fail, missing, "key not found in input_file")
+                    for key in keys:
+                        if key in items:
+                            in_flight[asyncio.create_task(handle(key))] = key
+
+                    if not in_flight:
+                        counts = await asyncio.to_thread(self.ledger.counts)
+                        progress.update(overall_task, completed=counts["done"] + counts["failed"] + counts["truncated"])
+                        if counts["pending"] == 0 and counts["leased"] == 0:
+                            break
+                        # 其他进程仍持有租约或失败条目在退避中：等待完成 / 过期 / 退避结束
+                        await asyncio.sleep(ledger_cfg.poll_interval)
+                        continue
+
+                done, _ = await asyncio.wait(in_flight.keys(), return_when=asyncio.FIRST_COMPLETED)
+                completed, truncated, failed = [], [], []
+                for task in done:
+                    del in_flight[task]
+                    key, res = task.result()
+                    if res:
+                        self._write_result(res)
+                        (truncated if res["status"] == "truncated" else completed).append(key)
+                        progress.update(overall_task, advance=1)
+                    else:
+                        # 失败条目可能重新进入 pending，进度在空闲轮询时按账本统计校正
+                        failed.append(key)
+                if completed:
+                    await asyncio.to_thread(self.ledger.complete, completed)
+                if truncated:
+                    await asyncio.to_thread(self.ledger.complete, truncated, TRUNCATED)
+                if failed:
+                    await asyncio.to_thread(self.ledger.fail, failed, "request failed")
+        finally:
+            renew_task.cancel()
+            if in_flight:
+                # 中断退出时归还未完成的租约，避免等待过期
+                for task in in_flight:
+                    task.cancel()
+                await asyncio.to_thread(self.ledger.release, list(in_flight.values()))
+
     def build_messages(self, item: Dict[str, Any], prompt_template: str) -> Tuple[list, str]:
         """
         构建 messages 输入：
@@ -165,9 +399,9 @@ class LLMEvaluator(BaseEvaluator):
                 # 兼容 list / 单图
                 if isinstance(value, list):
                     for v in value:
-                        image_urls.append(encode_image_to_base64(v))
+                        image_urls.append(self._image_url(v))
                 else:
-                    image_urls.append(encode_image_to_base64(value))
+                    image_urls.append(self._image_url(value))
             except Exception as e:
                 console.print(f"[yellow]{type(e).__name__}: {e}[/yellow]")
                 console.print(f"[dim]{traceback.format_exc()}[/dim]")
@@ -185,8 +419,15 @@ class LLMEvaluator(BaseEvaluator):
         return messages, formatted_prompt
 
 
-    async def _call_model(self, messages: list) -> Tuple[str, str]:
-        """调用模型 API（流式），返回 (response_text, raw_stream)"""
+    def _image_url(self, image) -> str:
+        """按图像传输策略返回 image_url：内联 Base64 或本地静态服务 URL"""
+        if self.image_server is not None:
+            data, mime = encode_image(image, self.image_config)
+            return self.image_server.url_for(data, mime)
+        return encode_image_to_base64(image, self.image_config)
+
+    async def _call_model(self, messages: list) -> Tuple[bool, Dict[str, Any]]:
+        """调用模型 API（流式），返回 (success, result)；失败时 result 含 error 字段"""
         item_idx, item_id, result = await self.stream_handler.run_completion_with_stream(
             messages=messages,
             item_idx=0,
@@ -195,5 +436,5 @@ class LLMEvaluator(BaseEvaluator):
             client=self.client
         )
         if "error" in result:
-            return False, result["error"]
-        return True, result.get("response", "")
+            return False, result
+        return True, result
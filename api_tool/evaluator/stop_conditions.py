@@ -0,0 +1,126 @@
+import json
+import re
+from typing import Optional, Tuple
+
+from api_tool.config import StopConfig
+
+
+class StopMatcher:
+    """
+    流式提前终止判定（每个请求一个实例，增量扫描）
+    支持：
+      - regex：正则命中（如 <score>5</score>）
+      - json_object：第一个顶层 JSON 对象闭合
+      - stop_sequences：出现任一停止串（结果不包含停止串本身）
+    skip_think=True 时只在 </think> 之后的正文中判定（与 ScoreExtractor 规则一致，不要求以 <think> 开头），
+    避免思考过程误触发；输出中没有 </think> 时不会提前终止，非思考模型请设为 false。
+    """
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, config: StopConfig):
+        self.pattern = re.compile(config.regex, re.S) if config.regex else None
+        self.json_object = config.json_object
+        self.stop_sequences = [s for s in config.stop_sequences if s]
+        self.skip_think = config.skip_think
+        self.regex_window = config.regex_window
+
+        self._body_start: Optional[int] = None  # 正文起点（跳过 think 后）
+        self._scanned = 0                       # 已扫描到的位置
+        # JSON 括号匹配状态
+        self._json_pos = 0                      # JSON 扫描位置（可能因等待后续字符而落后于 _scanned）
+        self._obj_start = -1                    # 当前候选对象的起点
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @classmethod
+    def from_config(cls, config: Optional[StopConfig]) -> Optional["StopMatcher"]:
+        """未配置任何条件时返回 None，调用方可直接跳过判定"""
+        if config is None or not (config.regex or config.json_object or any(config.stop_sequences)):
+            return None
+        return cls(config)
+
+    def _locate_body(self, text: str) -> Optional[int]:
+        if not self.skip_think:
+            return 0
+        end = text.find("</think>", max(0, self._scanned - len("</think>")))
+        return None if end < 0 else end + len("</think>")
+
+    def _check_json(self, text: str, start: int) -> Optional[int]:
+        """
+        增量括号匹配，返回第一个顶层 JSON 对象的结束位置
+        只有 '{' 后（跳过空白）紧跟 '"' 或 '}' 才作为候选起点，避免 LaTeX 的 \\frac{1}{2} 误触发；
+        括号闭合后再用 raw_decode 校验，失败则从候选起点之后继续扫描。
+        """
+        i = max(start, self._json_pos)
+        while i < len(text):
+            ch = text[i]
+            if self._depth == 0:
+                if ch == "{":
+                    j = i + 1
+                    while j < len(text) and text[j].isspace():
+                        j += 1
+                    if j == len(text):
+                        break  # 还看不到 '{' 之后的字符，等待更多输出
+                    if text[j] in "\"}":
+                        self._obj_start, self._depth = i, 1
+                i += 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        obj, end = self._decoder.raw_decode(text, self._obj_start)
+                    except ValueError:
+                        obj = None
+                    if isinstance(obj, dict):
+                        return end
+                    # 不是合法 JSON：从候选起点之后重新扫描
+                    i, self._in_string, self._escape = self._obj_start + 1, False, False
+                    continue
+            i += 1
+        self._json_pos = i
+        return None
+
+    def check(self, text: str) -> Optional[Tuple[str, int]]:
+        """
+        传入目前累计的完整文本，返回 (命中条件名, 截断位置) 或 None
+        """
+        if self._body_start is None:
+            self._body_start = self._locate_body(text)
+            if self._body_start is None:
+                self._scanned = len(text)
+                return None
+            self._scanned = self._body_start
+        start, prev = self._body_start, self._scanned
+        self._scanned = len(text)
+
+        if self.stop_sequences:
+            longest = max(len(s) for s in self.stop_sequences)
+            origin = max(start, prev - longest + 1)
+            hits = [i for i in (text.find(s, origin) for s in self.stop_sequences) if i >= 0]
+            if hits:
+                return "stop_sequence", min(hits)
+
+        if self.pattern is not None:
+            m = self.pattern.search(text, max(start, prev - self.regex_window))
+            if m:
+                return "regex", m.end()
+
+        if self.json_object:
+            end = self._check_json(text, start)
+            if end is not None:
+                return "json_object", end
+        return None
@@ -1,6 +1,9 @@
 import asyncio
-from typing import Tuple, Optional
-from openai import AsyncOpenAI
+from typing import Tuple, Optional, TYPE_CHECKING
+from api_tool.evaluator.stop_conditions import StopMatcher
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 
 class StreamHandler:
@@ -10,17 +13,26 @@ class StreamHandler:
         self.buffer = []
 
     async def _consume_stream(
-        self, agen, timeout: Optional[float] = None
-    ) -> Tuple[str, str]:
+        self,
+        agen,
+        timeout: Optional[float] = None,
+        stop_matcher: Optional[StopMatcher] = None,
+        prefix: str = "",
+    ) -> Tuple[str, str, Optional[str], Optional[str]]:
         """
-        异步消费 OpenAI 流式响应，支持整体超时
-        返回: (collected_text, raw_stream)
+        异步消费 OpenAI 流式响应，支持整体超时与提前终止
+        返回: (collected_text, raw_stream, stop_reason, finish_reason)
+        - collected_text 以 prefix 开头（续写时传入已生成部分），不做 strip
+        - stop_reason 非空表示命中提前终止条件，流已被关闭
+        - finish_reason == "length" 表示输出被 max_tokens 截断，已生成内容照常返回
         """
-        collected_text = ""
+        collected_text = prefix
+        stop_reason = None
+        finish_reason = None
         self.buffer.clear()
 
         async def _consume():
-            nonlocal collected_text
+            nonlocal collected_text, stop_reason, finish_reason
             async for chunk in agen:
                 self.buffer.append(str(chunk) + "\n")
 
@@ -34,23 +46,41 @@ class StreamHandler:
                 if text_piece:
                     collected_text += text_piece
 
-                if getattr(choice, "finish_reason", None) in ["length", "content_filter"]:
+                    if stop_matcher is not None:
+                        hit = stop_matcher.check(collected_text)
+                        if hit:
+                            stop_reason, cut = hit
+                            collected_text = collected_text[:cut]
+                            # 关闭连接，服务端随之取消生成，释放并发槽位
+                            await self._close_stream(agen)
+                            return
+
+                if getattr(choice, "finish_reason", None) == "content_filter":
                     raise ValueError(
                         f"Output truncated by model (finish_reason={choice.finish_reason})"
                     )
+                if getattr(choice, "finish_reason", None):
+                    finish_reason = choice.finish_reason
 
         if timeout:
             await asyncio.wait_for(_consume(), timeout=timeout)
         else:
             await _consume()
 
-        return collected_text.strip(), "".join(self.buffer)
+        return collected_text, "".join(self.buffer), stop_reason, finish_reason
+
+    @staticmethod
+    async def _close_stream(agen):
+        """关闭 openai.AsyncStream（close）或普通异步生成器（aclose）"""
+        close = getattr(agen, "close", None) or getattr(agen, "aclose", None)
+        if close is not None:
+            await close()
 
     async def run_completion_with_stream(
         self,
         messages,
         config,
-        client: AsyncOpenAI,
+        client: "AsyncOpenAI",
         item_idx: int = 0,
         item_id: Optional[str] = None,
     ) -> Tuple[int, Optional[str], str, str, dict]:
@@ -59,20 +89,60 @@ class StreamHandler:
         返回: (item_idx, item_id, metric, mode, parsed_result)
         """
         try:
-            # 异步客户端
-            response = await client.chat.completions.create(
-                model=config.model.model,
-                messages=messages,
-                stream=True,
-                temperature=config.model.temperature,
-                top_p=config.model.top_p,
-                max_tokens=config.model.max_tokens,
-                timeout=getattr(config, "timeout", None),
-            )
-
-            collected_text, _ = await self._consume_stream(
-                response, timeout=getattr(config, "timeout", None)
-            )
+            model_cfg = config.model
+            stop_matcher = StopMatcher.from_config(getattr(config, "stop", None))
+            collected_text = ""
+            continuations = 0
+            truncated_first = False
+            continuation_error = None
+
+            while True:
+                request_messages, extra = messages, {}
+                max_tokens = model_cfg.max_tokens
+                if continuations:
+                    # 续写：把已生成部分作为 assistant 前缀，提高 token 预算
+                    request_messages = messages + [{"role": "assistant", "content": collected_text}]
+                    max_tokens = model_cfg.continuation_max_tokens or 2 * model_cfg.max_tokens
+                    extra["extra_body"] = model_cfg.continuation_extra_body
+
+                try:
+                    # 异步客户端
+                    response = await client.chat.completions.create(
+                        model=model_cfg.model,
+                        messages=request_messages,
+                        stream=True,
+                        temperature=model_cfg.temperature,
+                        top_p=model_cfg.top_p,
+                        max_tokens=max_tokens,
+                        timeout=getattr(config, "timeout", None),
+                        **extra,
+                    )
+
+                    collected_text, _, stop_reason, finish_reason = await self._consume_stream(
+                        response,
+                        timeout=getattr(config, "timeout", None),
+                        stop_matcher=stop_matcher,
+                        prefix=collected_text,
+                    )
+                except Exception as e:
+                    if not continuations:
+                        raise
+                    # 续写失败：保留之前各轮已收集的文本，结果仍标记为截断
+                    continuation_error = (
+                        f"Timeout after {config.concurrency.timeout}s" if isinstance(e, asyncio.TimeoutError) else str(e)
+                    )
+                    print(f"⚠️ Continuation {continuations} failed for item #{item_idx}: {continuation_error}")
+                    continuations -= 1
+                    break
+
+                truncated = finish_reason == "length" and not stop_reason
+                if not continuations:
+                    truncated_first = truncated
+                if not truncated or not model_cfg.continue_on_truncation or continuations >= model_cfg.max_continuations:
+                    break
+                continuations += 1
+
+            collected_text = collected_text.strip()
 
             # ===== 后处理 thinking 标签 =====
             base_url = getattr(config.api, "base_url", "")
@@ -91,7 +161,17 @@ class StreamHandler:
                 else:
                     final_resp = collected_text
 
-            parsed_result = {"response": final_resp.strip()}
+            parsed_result = {
+                "response": final_resp.strip(),
+                "finish_reason": finish_reason,
+                "truncated": truncated,
+                "truncated_first": truncated_first,
+                "continuations": continuations,
+            }
+            if stop_reason:
+                parsed_result["stop_reason"] = stop_reason
+            if continuation_error:
+                parsed_result["continuation_error"] = continuation_error
             return item_idx, item_id, parsed_result
 
         except asyncio.TimeoutError:
@@ -1,19 +1,36 @@
 import asyncio
 import typer
 import traceback
-from rich.console import Console
-from api_tool.config import load_config
-from api_tool.evaluator.llm_evaluator import LLMEvaluator
+from enum import Enum
+from typing import Optional
 
 app = typer.Typer(add_completion=False)
 
+
+class ProfileMode(str, Enum):
+    """--profile 可选模式，与 profile_utils.PROFILE_MODES 一致"""
+    lag = "lag"
+    sample = "sample"
+    cprofile = "cprofile"
+
+
 @app.command(name="run")
 def run(
-    config_path: str = typer.Option("config.yaml", "--config-path", "-c", help="Path to the configuration file.")
+    config_path: str = typer.Option("config.yaml", "--config-path", "-c", help="Path to the configuration file."),
+    profile: Optional[ProfileMode] = typer.Option(
+        None, "--profile",
+        help="Profile the run: 'lag' (event-loop lag + blocking stacks), 'sample' (plus sampling profiler) "
+             "or 'cprofile' (plus cProfile). Reports are written next to results.jsonl.",
+    ),
+    lag_threshold_ms: float = typer.Option(100.0, "--lag-threshold-ms", help="Report callbacks blocking the loop longer than this."),
 ):
     """
     LLM-as-Judge: Automated evaluation using language models.
     """
+    # 重依赖（openai / httpx / rich / PIL ...）延迟到真正运行时再导入，加快 CLI 启动
+    from api_tool.config import load_config
+    from api_tool.evaluator.llm_evaluator import LLMEvaluator
+
     try:
         config = load_config(config_path)
         evaluator = LLMEvaluator(config)
@@ -22,7 +39,11 @@ def run(
         print(f"Loaded configuration from: {config_path}")
         print(f"Config: {config}")
 
-        asyncio.run(evaluator.run())
+        if profile:
+            from api_tool.utils.profile_utils import run_profiled
+            asyncio.run(run_profiled(evaluator.run, config.io.output_dir, profile.value, lag_threshold_ms))
+        else:
+            asyncio.run(evaluator.run())
 
     except FileNotFoundError:
         print(f"❌ Configuration file not found: {config_path}")
@@ -0,0 +1,57 @@
+import hashlib
+import socket
+import threading
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class ImageServer:
+    """
+    本地静态图片服务（image.transport = "url" 时使用）
+    图片按内容哈希落盘，请求体中只发送 URL，由网关回源拉取。
+    """
+
+    def __init__(self, serve_dir: str, host: str = "0.0.0.0", port: int = 0, public_url: Optional[str] = None):
+        self.serve_dir = Path(serve_dir)
+        self.serve_dir.mkdir(parents=True, exist_ok=True)
+        handler = partial(_QuietHandler, directory=str(self.serve_dir))
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        port = self.httpd.server_address[1]
+        self.public_url = (public_url or f"http://{self._local_ip()}:{port}").rstrip("/")
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _local_ip() -> str:
+        try:
+            return socket.gethostbyname(socket.gethostname())
+        except OSError:
+            return "127.0.0.1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="image-server", daemon=True)
+        self._thread.start()
+        print(f"🖼️ Serving images from {self.serve_dir} at {self.public_url}")
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def url_for(self, data: bytes, mime: str) -> str:
+        """写入图片（同内容只写一次）并返回可访问 URL"""
+        name = f"{hashlib.sha1(data).hexdigest()}.{EXTENSIONS.get(mime, 'bin')}"
+        path = self.serve_dir / name
+        if not path.exists():
+            tmp = path.with_suffix(".tmp")
+            tmp.write_bytes(data)
+            tmp.replace(path)
+        return f"{self.public_url}/{name}"
@@ -3,80 +3,183 @@ import io
 import math
 import mimetypes
 from pathlib import Path
-from PIL import Image, ImageOps
-from typing import Union, Dict
+from typing import Optional, Tuple, Union, Dict, TYPE_CHECKING
+from api_tool.config import ImageConfig
+
+# PIL 仅在真正编码图像时导入，纯文本任务不加载
+if TYPE_CHECKING:
+    from PIL import Image
 
 SHORT_MIN = 32
 LONG_MAX = 768
 
-def compute_scale(w: int, h: int) -> float:
+# 配置中的格式名 -> (PIL 格式, MIME)
+FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "jpg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+    "png": ("PNG", "image/png"),
+}
+# 可原样透传的源格式
+PASSTHROUGH_FORMATS = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+# 透传时允许的颜色模式（CMYK JPEG、16 位 PNG 等许多视觉接口不支持，需转换后重新编码）
+PASSTHROUGH_MODES = {
+    "JPEG": {"RGB", "L"},
+    "PNG": {"RGB", "RGBA", "L", "LA", "P", "1"},
+    "WEBP": {"RGB", "RGBA"},
+}
+
+def compute_scale(w: int, h: int, min_side: int = SHORT_MIN, max_side: int = LONG_MAX) -> float:
     short_side, long_side = min(w, h), max(w, h)
-    need_up = short_side < SHORT_MIN
-    need_down = long_side > LONG_MAX
+    need_up = short_side < min_side
+    need_down = long_side > max_side
     if not need_up and not need_down:
         return 1.0
-    up_min = SHORT_MIN / short_side if need_up else 1.0
-    down_max = LONG_MAX / long_side if need_down else 1.0
+    up_min = min_side / short_side if need_up else 1.0
+    down_max = max_side / long_side if need_down else 1.0
     return min(up_min, down_max)
 
-def resize_image(img: Image.Image) -> Image.Image:
+def resize_image(img: "Image.Image", min_side: int = SHORT_MIN, max_side: int = LONG_MAX) -> "Image.Image":
+    from PIL import Image
+
     w, h = img.size
-    scale = compute_scale(w, h)
+    scale = compute_scale(w, h, min_side, max_side)
     if scale != 1.0:
         new_size = (max(1, int(math.ceil(w * scale))),
                     max(1, int(math.ceil(h * scale))))
         img = img.resize(new_size, Image.BICUBIC)
     return img
 
-def encode_image_to_base64(image: Union[Path, Image.Image, str, Dict]) -> str:
+def load_image(image: Union[Path, "Image.Image", str, Dict]) -> Tuple["Image.Image", Optional[bytes]]:
     """
-    将图片编码为 Base64 Data URL
+    读取图片，返回 (PIL.Image, 原始字节)
     支持类型：
       - Path 或 str (文件路径)
-      - PIL.Image.Image
+      - PIL.Image.Image（原始字节为 None）
       - dict {'bytes': b'...', 'path': '...'}
     """
-    try:
-        # 1️⃣ dict 类型
-        if isinstance(image, dict):
-            if "bytes" in image:
-                img = Image.open(io.BytesIO(image["bytes"]))
-                # print(1)
-            elif "path" in image:
-                img = Image.open(Path(image["path"]))
-                # print(2)
-            else:
-                raise TypeError("dict image must contain 'bytes' or 'path'")
-        
-        # 2️⃣ Path 类型
-        elif isinstance(image, Path):
-            mime_type, _ = mimetypes.guess_type(image)
-            # print(3)
-            if not mime_type or not mime_type.startswith("image"):
-                raise ValueError(f"Invalid image MIME: {image}")
-            with Image.open(image) as img_tmp:
-                img = img_tmp.copy()
-        
-        # 3️⃣ PIL.Image.Image 类型
-        elif isinstance(image, Image.Image):
-            img = image
-            # print(4)
-        
-        # 4️⃣ str 类型（路径）
-        elif isinstance(image, str):
-            img = Image.open(Path(image))
-            # print(5)
+    from PIL import Image
+
+    # 1️⃣ dict 类型
+    if isinstance(image, dict):
+        if image.get("bytes"):
+            raw = image["bytes"]
+        elif image.get("path"):
+            raw = Path(image["path"]).read_bytes()
         else:
-            raise TypeError(f"Unsupported image type: {type(image)}")
+            raise TypeError("dict image must contain 'bytes' or 'path'")
+
+    # 2️⃣ Path 类型
+    elif isinstance(image, Path):
+        mime_type, _ = mimetypes.guess_type(image)
+        if not mime_type or not mime_type.startswith("image"):
+            raise ValueError(f"Invalid image MIME: {image}")
+        raw = image.read_bytes()
+
+    # 3️⃣ PIL.Image.Image 类型
+    elif isinstance(image, Image.Image):
+        return image, None
+
+    # 4️⃣ str 类型（路径）
+    elif isinstance(image, str):
+        raw = Path(image).read_bytes()
+    else:
+        raise TypeError(f"Unsupported image type: {type(image)}")
+
+    return Image.open(io.BytesIO(raw)), raw
+
+def _can_passthrough(img: "Image.Image", raw: Optional[bytes], pil_format: str, config: ImageConfig) -> bool:
+    """
+    是否可跳过重新编码，直接发送源图字节：
+      - 源格式与目标格式一致；或 passthrough=True 时源格式为 JPEG / PNG / WEBP 之一
+      - 且源图颜色模式为常见模式，并满足字节预算、尺寸与方向约束
+    """
+    if raw is None or img.format not in PASSTHROUGH_FORMATS:
+        return False
+    if img.mode not in PASSTHROUGH_MODES[img.format]:
+        return False
+    if img.format != pil_format and not config.passthrough:
+        return False
+    if config.max_bytes and len(raw) > config.max_bytes:
+        return False
+    if compute_scale(*img.size, config.min_side, config.max_side) != 1.0:
+        return False
+    # 带 EXIF 旋转信息的图需要 exif_transpose
+    return img.getexif().get(0x0112, 1) == 1
+
+def _save(img: "Image.Image", pil_format: str, quality: int) -> bytes:
+    buf = io.BytesIO()
+    if pil_format == "PNG":
+        img.save(buf, format="PNG", optimize=True)
+    else:
+        img.save(buf, format=pil_format, quality=quality)
+    return buf.getvalue()
 
-        # 统一处理：旋转、缩放、转换为 RGB
+def _encode_within_budget(img: "Image.Image", pil_format: str, config: ImageConfig) -> bytes:
+    """按预算编码：先二分搜索质量，仍超出则逐步缩小尺寸"""
+    from PIL import Image
+
+    data = _save(img, pil_format, config.quality)
+    if not config.max_bytes or len(data) <= config.max_bytes:
+        return data
+
+    for _ in range(4):
+        if pil_format != "PNG":
+            lo, hi, best = config.min_quality, config.quality - 1, None
+            while lo <= hi:
+                q = (lo + hi) // 2
+                candidate = _save(img, pil_format, q)
+                if len(candidate) <= config.max_bytes:
+                    best, lo = candidate, q + 1
+                else:
+                    data, hi = candidate, q - 1
+            if best is not None:
+                return best
+        # 最低质量仍超预算：缩小 25% 再试
+        w, h = img.size
+        if min(w, h) * 0.75 < config.min_side:
+            break
+        img = img.resize((max(1, int(w * 0.75)), max(1, int(h * 0.75))), Image.BICUBIC)
+        data = _save(img, pil_format, config.quality)
+        if len(data) <= config.max_bytes:
+            return data
+    return data
+
+def encode_image(image: Union[Path, "Image.Image", str, Dict], config: Optional[ImageConfig] = None) -> Tuple[bytes, str]:
+    """
+    按图像传输策略编码图片，返回 (图片字节, MIME)
+    - 源图已是 config.format 且满足约束时直接透传
+    - passthrough=True 时，其他格式（如 TikZ 导出的 PNG）满足约束也直接透传
+    - 否则旋转、缩放后按 config.format 编码，并在 max_bytes 预算内自适应质量
+    """
+    from PIL import ImageOps
+
+    config = config or ImageConfig()
+    if config.format.lower() not in FORMATS:
+        raise ValueError(f"Unsupported image format: {config.format}")
+    pil_format, mime = FORMATS[config.format.lower()]
+
+    try:
+        img, raw = load_image(image)
+        if _can_passthrough(img, raw, pil_format, config):
+            return raw, PASSTHROUGH_FORMATS[img.format]
+
+        # 统一处理：旋转、缩放、转换颜色模式
         img = ImageOps.exif_transpose(img)
-        img = resize_image(img).convert("RGB")
+        img = resize_image(img, config.min_side, config.max_side)
+        if pil_format == "JPEG":
+            img = img.convert("RGB")
+        elif img.mode not in ("RGB", "RGBA", "L", "LA") or (pil_format == "WEBP" and img.mode in ("L", "LA")):
+            img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
 
-        # 保存到 buffer 并转 base64
-        buf = io.BytesIO()
-        img.save(buf, format="JPEG", quality=90)
-        return f"data:image/jpeg;base64,{base64.b64encode(buf.getvalue()).decode()}"
+        return _encode_within_budget(img, pil_format, config), mime
 
     except Exception as e:
         raise RuntimeError(f"Failed to encode image: {e}")
+
+def encode_image_to_base64(image: Union[Path, "Image.Image", str, Dict], config: Optional[ImageConfig] = None) -> str:
+    """
+    将图片编码为 Base64 Data URL（编码策略见 encode_image）
+    """
+    data, mime = encode_image(image, config)
+    return f"data:{mime};base64,{base64.b64encode(data).decode()}"
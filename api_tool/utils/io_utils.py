@@ -1,8 +1,7 @@
-import json
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
-import pandas as pd
 from rich.console import Console
+from api_tool.utils.json_utils import dumps_bytes, iter_jsonl_lines, loads
 
 console = Console()
 
@@ -11,39 +10,35 @@ def load_jsonl(file_path: Union[str, Path]) -> List[Dict[str, Any]]:
     path = Path(file_path)
     if not path.exists():
         raise FileNotFoundError(f"Dataset file not found: {file_path}")
-    with path.open("r", encoding="utf-8") as f:
-        return [json.loads(line) for line in f if line.strip()]
+    return [loads(line) for line in iter_jsonl_lines(path)]
 
 def append_jsonl(record: Dict[str, Any], file_path: Union[str, Path]):
     """追加记录到 JSONL 文件"""
     path = Path(file_path)
     path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    with path.open("ab") as f:
+        f.write(dumps_bytes(record) + b"\n")
         f.flush()
 
 def load_parquet(file_path: Union[str, Path]) -> List[Dict[str, Any]]:
     """加载 Parquet 文件"""
+    # pandas 导入耗时，纯 JSONL 任务不需要
+    import pandas as pd
+
     path = Path(file_path)
     if not path.exists():
         raise FileNotFoundError(f"Dataset file not found: {file_path}")
     df = pd.read_parquet(path)
     return df.to_dict(orient="records")
 
-def load_dataset_skip_existing(
-    input_file: Union[str, Path],
-    output_file: Optional[Union[str, Path]] = None,
-    key_name: str = "id"
-) -> List[Dict[str, Any]]:
+def load_dataset(input_file: Union[str, Path]) -> List[Dict[str, Any]]:
     """
-    加载数据集，并自动去掉 output_file 已存在的记录。
-    支持 JSONL 和 Parquet 文件（通过后缀判断）。
+    加载完整数据集，支持 JSONL 和 Parquet 文件（通过后缀判断）。
     """
     input_path = Path(input_file)
     if not input_path.exists():
         raise FileNotFoundError(f"Input dataset not found: {input_file}")
 
-    # 1️⃣ 加载原始数据集
     if input_path.suffix.lower() in {".jsonl", ".json"}:
         dataset = load_jsonl(input_path)
     elif input_path.suffix.lower() in {".parquet", ".pq"}:
@@ -51,9 +46,25 @@ def load_dataset_skip_existing(
     else:
         raise ValueError(f"Unsupported input file format: {input_file}")
 
+    console.print(f"[bold blue]📘 Loaded dataset: {len(dataset)} total items[/bold blue]")
+    if dataset:
+        console.print(dataset[0])
+    return dataset
+
+def load_dataset_skip_existing(
+    input_file: Union[str, Path],
+    output_file: Optional[Union[str, Path]] = None,
+    key_name: str = "id",
+    retry_truncated: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    加载数据集，并自动去掉 output_file 已存在的记录。
+    支持 JSONL 和 Parquet 文件（通过后缀判断）。
+    retry_truncated=True 时 status == "truncated" 的记录不算完成（同一主键已有其他记录的除外）。
+    """
+    # 1️⃣ 加载原始数据集
+    dataset = load_dataset(input_file)
     total_count = len(dataset)
-    console.print(f"[bold blue]📘 Loaded dataset: {total_count} total items[/bold blue]")
-    console.print(dataset[0])
 
     # 2️⃣ 如果没有输出文件，则返回全部数据
     if output_file is None:
@@ -77,7 +88,10 @@ def load_dataset_skip_existing(
         raise ValueError(f"Unsupported output file format: {output_file}")
 
     scored_count = len(scored_data)
-    scored_keys = {str(item[key_name]) for item in scored_data if key_name in item}
+    scored_keys = {
+        str(item[key_name]) for item in scored_data
+        if key_name in item and not (retry_truncated and item.get("status") == "truncated")
+    }
 
     # 5️⃣ 去掉重复项
     filtered_dataset = [item for item in dataset if str(item.get(key_name)) not in scored_keys]
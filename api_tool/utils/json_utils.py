@@ -0,0 +1,83 @@
+"""
+JSON 编解码封装：安装了 orjson 时使用 orjson，否则回退到标准库 json。
+
+两种后端都输出 UTF-8、不转义非 ASCII（等价于 ensure_ascii=False）、紧凑分隔符
+（"," 与 ":"），常规数据解析回来的结果一致，但字节并不完全相同：
+  - 浮点指数写法不同（orjson 为 1e16 / 1e-7，标准库为 1e+16 / 1e-07）；
+  - NaN / Infinity：orjson 写为 null，标准库写为 NaN / Infinity（非标准 JSON）。
+读取时 orjson 解析失败会回退到标准库，因此标准库写出的 NaN / Infinity 仍可读回。
+"""
+import json
+from pathlib import Path
+from typing import Any, Iterator, Union
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# 与 orjson 默认行为对齐：非 str 键转为字符串、支持 numpy 标量/数组（parquet 数据常见）
+_ORJSON_OPTS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson is not None else 0
+
+# 批量读取块大小
+READ_BLOCK_SIZE = 16 * 1024 * 1024
+
+
+def _stdlib_default(obj: Any) -> Any:
+    # numpy 标量 / 数组等，与 orjson 的 OPT_SERIALIZE_NUMPY 对齐
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _stdlib_dumps(obj: Any) -> str:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_stdlib_default)
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """序列化为 UTF-8 字节"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=_ORJSON_OPTS)
+        except TypeError:
+            # orjson 不支持的类型（如超过 64 位的整数）回退到标准库
+            pass
+    return _stdlib_dumps(obj).encode("utf-8")
+
+
+def dumps(obj: Any) -> str:
+    """序列化为 str"""
+    if orjson is not None:
+        return dumps_bytes(obj).decode("utf-8")
+    return _stdlib_dumps(obj)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """反序列化，直接接受 bytes，避免先解码成 str"""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson 只接受严格 JSON；标准库写出的 NaN / Infinity 等交给 json 解析
+            pass
+    return json.loads(data)
+
+
+def iter_jsonl_lines(path: Union[str, Path], block_size: int = READ_BLOCK_SIZE, offset: int = 0) -> Iterator[bytes]:
+    """按大块读取 JSONL（可从字节偏移 offset 开始），逐行返回非空 bytes（不做逐行文本解码）"""
+    with Path(path).open("rb") as f:
+        f.seek(offset)
+        tail = b""
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            lines = (tail + block).split(b"\n")
+            tail = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield line
+        if tail.strip():
+            yield tail
@@ -0,0 +1,198 @@
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+PENDING, LEASED, DONE, FAILED, TRUNCATED = "pending", "leased", "done", "failed", "truncated"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    key TEXT PRIMARY KEY,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,                   -- leased：租约到期时间；pending：失败退避结束前不可领取
+    updated_at REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_items_state ON items (state, lease_expires);
+"""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class WorkLedger:
+    """
+    基于 SQLite 的工作账本，用于多进程 / 多节点动态分发任务
+    - 每个条目状态：pending / leased / done / failed / truncated（已写出结果但被 max_tokens 截断）
+    - lease() 按批次租用 pending 条目，租约过期的条目（进程崩溃）会被自动回收
+    - 失败的条目按 retry_backoff × 2^(attempts-1) 退避后才能再次领取，避免短暂故障瞬间耗尽重试次数
+    - 失败次数达到 max_attempts 后标记为 failed，不再分发（可用 requeue(FAILED) 重新置为 pending）
+    所有写操作使用 BEGIN IMMEDIATE 事务，多个进程可以安全地共享同一个数据库文件。
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        lease_seconds: float = 600,
+        max_attempts: int = 3,
+        retry_backoff: float = 30.0,
+        worker_id: Optional[str] = None,
+        busy_timeout: float = 60,
+    ):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.worker_id = worker_id or default_worker_id()
+        # isolation_level=None：手动管理事务；check_same_thread=False：允许在 asyncio.to_thread 中调用
+        self.conn = sqlite3.connect(str(self.path), timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        # 同一连接可能被多个 to_thread 调用并发使用，串行化所有操作
+        self.lock = threading.Lock()
+
+    def close(self):
+        self.conn.close()
+
+    def _transaction(self):
+        return _Transaction(self.conn, self.lock)
+
+    # ---------- 初始化 ----------
+    def seed(self, keys: Iterable[str]) -> int:
+        """写入条目（已存在的保持原状态，按 key 判断），返回新增数量"""
+        keys = [str(k) for k in keys]
+        now = time.time()
+        with self._transaction() as cur:
+            before = cur.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+            cur.executemany(
+                "INSERT OR IGNORE INTO items (key, state, updated_at) VALUES (?, 'pending', ?)",
+                ((k, now) for k in keys),
+            )
+            after = cur.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        return after - before
+
+    # ---------- 租约 ----------
+    def lease(self, n: int) -> List[str]:
+        """回收过期租约后，租用至多 n 个 pending 条目（跳过仍在失败退避中的条目）"""
+        now = time.time()
+        with self._transaction() as cur:
+            self._reclaim_expired(cur, now)
+            keys = [row[0] for row in cur.execute(
+                "SELECT key FROM items WHERE state = 'pending' AND (lease_expires IS NULL OR lease_expires <= ?) "
+                "LIMIT ?",
+                (now, n),
+            )]
+            cur.executemany(
+                "UPDATE items SET state = 'leased', lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE key = ?",
+                ((self.worker_id, now + self.lease_seconds, now, k) for k in keys),
+            )
+        return keys
+
+    def _reclaim_expired(self, cur, now: float):
+        cur.execute(
+            "UPDATE items SET state = 'failed', lease_owner = NULL, error = 'lease expired', updated_at = ? "
+            "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+            (now, now, self.max_attempts),
+        )
+        cur.execute(
+            "UPDATE items SET state = 'pending', lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE state = 'leased' AND lease_expires < ?",
+            (now, now),
+        )
+
+    def renew(self, keys: Iterable[str]):
+        """延长本进程持有的租约"""
+        now = time.time()
+        with self._transaction() as cur:
+            cur.executemany(
+                "UPDATE items SET lease_expires = ?, updated_at = ? "
+                "WHERE key = ? AND state = 'leased' AND lease_owner = ?",
+                ((now + self.lease_seconds, now, str(k), self.worker_id) for k in keys),
+            )
+
+    def complete(self, keys: Iterable[str], state: str = DONE):
+        """标记为已完成（state 为 done 或 truncated）"""
+        now = time.time()
+        with self._transaction() as cur:
+            cur.executemany(
+                "UPDATE items SET state = ?, lease_owner = NULL, error = NULL, updated_at = ? WHERE key = ?",
+                ((state, now, str(k)) for k in keys),
+            )
+
+    def fail(self, keys: Iterable[str], error: str = ""):
+        """失败的条目退避后重新进入 pending，达到 max_attempts 则标记为 failed"""
+        now = time.time()
+        with self._transaction() as cur:
+            cur.executemany(
+                "UPDATE items SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "lease_expires = ? + ? * (1 << MAX(attempts - 1, 0)), "
+                "lease_owner = NULL, error = ?, updated_at = ? WHERE key = ? AND state = 'leased'",
+                ((self.max_attempts, now, self.retry_backoff, error, now, str(k)) for k in keys),
+            )
+
+    def release(self, keys: Iterable[str]):
+        """主动归还未处理的租约（不计入尝试次数）"""
+        now = time.time()
+        with self._transaction() as cur:
+            cur.executemany(
+                "UPDATE items SET state = 'pending', lease_owner = NULL, lease_expires = NULL, "
+                "attempts = MAX(attempts - 1, 0), updated_at = ? WHERE key = ? AND state = 'leased' AND lease_owner = ?",
+                ((now, str(k), self.worker_id) for k in keys),
+            )
+
+    def requeue(self, state: str) -> int:
+        """把处于 state 的条目重新置为 pending（清零尝试次数），返回数量"""
+        now = time.time()
+        with self._transaction() as cur:
+            cur.execute(
+                "UPDATE items SET state = 'pending', lease_owner = NULL, lease_expires = NULL, attempts = 0, "
+                "error = NULL, updated_at = ? WHERE state = ?",
+                (now, state),
+            )
+            return cur.rowcount
+
+    # ---------- 统计 ----------
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        result = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0, TRUNCATED: 0}
+        with self.lock:
+            rows = self.conn.execute("SELECT state, COUNT(*) FROM items GROUP BY state").fetchall()
+        for state, n in rows:
+            result[state] = n
+        return result
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT / ROLLBACK"""
+
+    def __init__(self, conn: sqlite3.Connection, lock: threading.Lock):
+        self.conn = conn
+        self.lock = lock
+
+    def __enter__(self) -> sqlite3.Cursor:
+        self.lock.acquire()
+        try:
+            self.cur = self.conn.cursor()
+            self.cur.execute("BEGIN IMMEDIATE")
+        except BaseException:
+            self.lock.release()
+            raise
+        return self.cur
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.cur.execute("ROLLBACK" if exc_type else "COMMIT")
+            self.cur.close()
+        finally:
+            self.lock.release()
+        return False
@@ -0,0 +1,62 @@
+"""
+根据在线聚合结果（aggregates*.json）绘制得分分布直方图，无需重新扫描 results.jsonl
+
+运行：
+    python -m api_tool.utils.plot_utils outputs/qwen3_verify/
+"""
+from pathlib import Path
+from typing import List, Optional
+
+import typer
+
+from api_tool.config import ScoreConfig
+from api_tool.utils.score_utils import OnlineAggregator, merge_aggregate_files
+
+
+def plot_histograms(aggregator: OnlineAggregator, output_path: str):
+    """每个 (template, model) 分组一张子图"""
+    # matplotlib 导入很慢，仅在绘图时导入
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    groups = [(key, s) for key, s in aggregator.groups.items() if s.count]
+    if not groups:
+        print("⚠️ No numeric scores to plot")
+        return
+
+    fig, axes = plt.subplots(len(groups), 1, figsize=(8, 3 * len(groups)), squeeze=False)
+    for ax, (key, s) in zip(axes[:, 0], groups):
+        width = (s.hist_max - s.hist_min) / s.bins
+        edges = [s.hist_min + i * width for i in range(s.bins)]
+        ax.bar(edges, s.hist, width=width, align="edge", edgecolor="black")
+        ax.set_title(f"{key}  (n={s.count}, mean={s.mean:.3f})", fontsize=9)
+        ax.set_xlabel("score")
+        ax.set_ylabel("count")
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=150)
+    print(f"📊 Histogram saved to {output_path}")
+
+
+app = typer.Typer(add_completion=False)
+
+
+@app.command()
+def main(
+    output_dir: str = typer.Argument(..., help="Run output directory containing aggregates*.json."),
+    output: Optional[str] = typer.Option(None, help="PNG path (default: <output_dir>/score_hist.png)."),
+):
+    """
+    Plot score histograms from persisted online aggregates.
+    """
+    paths: List[Path] = sorted(Path(output_dir).glob("aggregates*.json"))
+    if not paths:
+        raise typer.BadParameter(f"No aggregates*.json found in {output_dir}")
+    aggregator = merge_aggregate_files(paths, ScoreConfig())
+    for line in aggregator.summary_lines():
+        print(line)
+    plot_histograms(aggregator, output or str(Path(output_dir) / "score_hist.png"))
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,179 @@
+import asyncio
+import cProfile
+import io
+import math
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from api_tool.utils.json_utils import dumps, dumps_bytes
+
+PROFILE_MODES = ("lag", "sample", "cprofile")
+
+
+class LoopLagMonitor:
+    """
+    事件循环延迟监控（开销很低，可在生产中常开）
+    - 心跳协程：每 interval 秒 sleep 一次，记录实际唤醒延迟（对数分桶直方图）
+    - 看门狗线程：心跳超过 threshold 未更新时，抓取事件循环线程当前栈，
+      写入 <output_dir>/loop_lag.jsonl（每次阻塞只记录一次）
+    - sample_hz > 0 时看门狗同时作为采样 profiler，按频率采集循环线程栈，
+      结束时写出 <output_dir>/profile.folded（可直接用于 flamegraph.pl / speedscope）
+    """
+
+    def __init__(self, output_dir: Union[str, Path], threshold: float = 0.1,
+                 interval: float = 0.05, sample_hz: float = 0.0):
+        self.output_dir = Path(output_dir)
+        self.threshold = threshold
+        self.interval = interval
+        self.sample_hz = sample_hz
+
+        self.lag_buckets: Counter = Counter()  # log2(ms) -> 次数
+        self.lag_max = 0.0
+        self.lag_count = 0
+        self.blocked_events = 0
+        self.samples: Counter = Counter()
+
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._reported_beat: Optional[float] = None
+        self._stop = threading.Event()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._events_file = None
+
+    # ---------- 生命周期 ----------
+    def start(self):
+        """需在事件循环内调用"""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._events_file = (self.output_dir / "loop_lag.jsonl").open("ab")
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._heartbeat_task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watchdog, name="loop-lag-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> Dict[str, float]:
+        self._stop.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+        self._events_file.close()
+
+        summary = self.summary()
+        (self.output_dir / "loop_lag_summary.json").write_text(dumps(summary), encoding="utf-8")
+        if self.samples:
+            lines = [f"{stack} {n}" for stack, n in self.samples.most_common()]
+            (self.output_dir / "profile.folded").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return summary
+
+    # ---------- 心跳 ----------
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - self._beat - self.interval)
+            self.lag_count += 1
+            self.lag_max = max(self.lag_max, lag)
+            self.lag_buckets[max(0, math.ceil(math.log2(lag * 1000))) if lag > 0.001 else 0] += 1
+
+    # ---------- 看门狗 / 采样 ----------
+    def _watchdog(self):
+        period = 1.0 / self.sample_hz if self.sample_hz > 0 else self.interval / 2
+        while not self._stop.wait(period):
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            if self.sample_hz > 0:
+                self.samples[self._fold(frame)] += 1
+
+            beat = self._beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked > self.threshold and self._reported_beat != beat:
+                self._reported_beat = beat
+                self.blocked_events += 1
+                event = {
+                    "ts": time.time(),
+                    "blocked_ms": round(blocked * 1000, 1),
+                    "stack": traceback.format_stack(frame),
+                }
+                self._events_file.write(dumps_bytes(event) + b"\n")
+                self._events_file.flush()
+
+    @staticmethod
+    def _fold(frame) -> str:
+        parts: List[str] = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{Path(code.co_filename).name}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(parts))
+
+    # ---------- 统计 ----------
+    def _percentile(self, q: float) -> float:
+        """根据对数分桶估算分位数（ms，取桶上界，且不超过实测最大值）"""
+        if not self.lag_count:
+            return 0.0
+        target, seen = q * self.lag_count, 0
+        for bucket in sorted(self.lag_buckets):
+            seen += self.lag_buckets[bucket]
+            if seen >= target:
+                return min(float(2 ** bucket), self.lag_max * 1000)
+        return self.lag_max * 1000
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "samples": self.lag_count,
+            "lag_p50_ms": self._percentile(0.50),
+            "lag_p99_ms": self._percentile(0.99),
+            "lag_max_ms": round(self.lag_max * 1000, 1),
+            "blocked_events": self.blocked_events,
+            "threshold_ms": self.threshold * 1000,
+        }
+
+
+async def run_profiled(
+    main: Callable[[], Awaitable[None]],
+    output_dir: Union[str, Path],
+    mode: str = "lag",
+    threshold_ms: float = 100.0,
+    sample_hz: float = 100.0,
+):
+    """
+    在事件循环延迟监控下运行 main()，结果写入 output_dir（与 results.jsonl 同目录）：
+      - lag：仅延迟监控与阻塞栈（loop_lag.jsonl / loop_lag_summary.json）
+      - sample：额外采样循环线程栈，输出 profile.folded
+      - cprofile：额外用 cProfile 包裹运行，输出 profile.prof 与 profile.txt
+    """
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode} (expected one of {PROFILE_MODES})")
+    output_dir = Path(output_dir)
+    monitor = LoopLagMonitor(
+        output_dir, threshold=threshold_ms / 1000, sample_hz=sample_hz if mode == "sample" else 0.0
+    )
+    profiler = cProfile.Profile() if mode == "cprofile" else None
+
+    monitor.start()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        await main()
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(str(output_dir / "profile.prof"))
+            buf = io.StringIO()
+            pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(50)
+            (output_dir / "profile.txt").write_text(buf.getvalue(), encoding="utf-8")
+        summary = await monitor.stop()
+        print(f"⏱️ Event loop lag: {summary} (details in {output_dir})")
@@ -39,7 +39,7 @@ class AverageTimeRemainingColumn(TimeRemainingColumn):
 
 
 class RequestsStatusColumn(TextColumn):
-    """显示当前活动请求数、已发送总请求数、成功请求数"""
+    """显示当前活动请求数、已发送总请求数、成功请求数、截断率、平均请求大小"""
     def __init__(self, evaluator, **kwargs):
         # 传入空字符串不会在列前添加额外文字
         super().__init__("", **kwargs)
@@ -51,6 +51,13 @@ class RequestsStatusColumn(TextColumn):
             f"Sent: {self.evaluator.total_requests_sent} | "
             f"Success: {self.evaluator.total_requests_success}"
         )
+        truncated = getattr(self.evaluator, "total_truncated_first", 0)
+        if truncated and self.evaluator.total_requests_success:
+            text += f" | Truncated: {truncated} ({truncated / self.evaluator.total_requests_success:.1%})"
+        bytes_sent = getattr(self.evaluator, "total_bytes_sent", 0)
+        if bytes_sent and self.evaluator.total_requests_sent:
+            text += f" | {bytes_sent / self.evaluator.total_requests_sent / 1024:.1f} KB/req"
+
         return Text(text, style="green")
 
 
@@ -0,0 +1,241 @@
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+
+from api_tool.config import ScoreConfig
+from api_tool.utils.json_utils import dumps, loads
+
+Score = Union[float, str]
+
+
+class ScoreExtractor:
+    """
+    从模型回复中提取得分 / 判定
+    - patterns：依次尝试的正则，取第 1 个捕获组（无捕获组则取整体匹配）
+    - json_path：回复中 JSON 对象的点分路径，如 "result.score"
+    能转成有限数字的返回 float，否则返回去除空白的字符串（如 "correct"、"infinity"）。
+    """
+
+    def __init__(self, config: ScoreConfig):
+        self.patterns = [re.compile(p, re.S) for p in config.patterns]
+        self.json_path = config.json_path.split(".") if config.json_path else None
+        self.match = config.match
+        self.skip_think = config.skip_think
+
+    @classmethod
+    def from_config(cls, config: Optional[ScoreConfig]) -> Optional["ScoreExtractor"]:
+        """未配置提取规则时返回 None"""
+        if config is None or not (config.patterns or config.json_path):
+            return None
+        return cls(config)
+
+    def extract(self, text: str) -> Optional[Score]:
+        if not text:
+            return None
+        if self.skip_think and "</think>" in text:
+            text = text.rsplit("</think>", 1)[1]
+
+        for pattern in self.patterns:
+            matches = list(pattern.finditer(text)) if self.match == "last" else [pattern.search(text)]
+            m = matches[-1] if matches else None
+            if m:
+                return self._normalize(m.group(1) if pattern.groups else m.group(0))
+
+        if self.json_path:
+            obj = self._last_json_object(text)
+            for key in self.json_path:
+                if not isinstance(obj, dict) or key not in obj:
+                    obj = None
+                    break
+                obj = obj[key]
+            if obj is not None and not isinstance(obj, (dict, list)):
+                return self._normalize(obj)
+        return None
+
+    @staticmethod
+    def _last_json_object(text: str, max_candidates: int = 64) -> Any:
+        """在最后 max_candidates 个 '{' 中解析顶层 JSON 对象，返回最靠后的一个"""
+        decoder = json.JSONDecoder()
+        positions = [m.start() for m in re.finditer(r"\{", text)]
+        result, skip_until = None, -1
+        for pos in positions[-max_candidates:]:
+            if pos < skip_until:
+                continue  # 已解析对象内部的嵌套对象
+            try:
+                obj, end = decoder.raw_decode(text, pos)
+            except ValueError:
+                continue
+            if isinstance(obj, dict):
+                result, skip_until = obj, end
+        return result
+
+    @staticmethod
+    def _normalize(value: Any) -> Optional[Score]:
+        if isinstance(value, bool):
+            return str(value).lower()
+        if isinstance(value, (int, float)):
+            # JSON 中的 NaN / Infinity
+            return float(value) if math.isfinite(value) else None
+        value = str(value).strip()
+        try:
+            number = float(value)
+        except ValueError:
+            return value or None
+        # float() 也接受 "nan" / "inf" / "infinity"，按判定字符串处理
+        return number if math.isfinite(number) else value
+
+
+class GroupStats:
+    """
+    单个分组的在线统计：计数、Welford 均值/方差、最值、直方图、判定计数
+    统计单位是记录（results.jsonl 的行）而不是主键：retry_truncated 重试的条目，
+    旧的截断记录和新记录都会计入，truncated 给出其中截断记录的数量。
+    """
+
+    def __init__(self, bins: int, hist_min: float, hist_max: float):
+        self.bins, self.hist_min, self.hist_max = bins, hist_min, hist_max
+        self.records = 0        # 写入的记录数（同一主键可能有多条）
+        self.truncated = 0      # 其中 status == "truncated" 的记录数
+        self.missing = 0        # 未提取到分数的记录数
+        self.count = 0          # 数值分数个数
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.hist = [0] * bins
+        self.verdicts: Counter = Counter()
+
+    def add(self, value: Optional[Score], truncated: bool = False):
+        self.records += 1
+        self.truncated += truncated
+        if value is None or (isinstance(value, float) and not math.isfinite(value)):
+            # 非有限值会污染均值 / 方差且无法落入直方图
+            self.missing += 1
+        elif isinstance(value, float):
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+            self.min, self.max = min(self.min, value), max(self.max, value)
+            width = (self.hist_max - self.hist_min) / self.bins
+            idx = int((value - self.hist_min) // width) if width > 0 else 0
+            self.hist[min(max(idx, 0), self.bins - 1)] += 1
+        else:
+            self.verdicts[value] += 1
+
+    def merge(self, other: "GroupStats"):
+        """合并另一个分组（Chan 并行方差公式），用于多进程汇总"""
+        n = self.count + other.count
+        if other.count:
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / n
+            self.m2 += other.m2 + delta * delta * self.count * other.count / n
+        self.count = n
+        self.records += other.records
+        self.truncated += other.truncated
+        self.missing += other.missing
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        self.hist = [a + b for a, b in zip(self.hist, other.hist)]
+        self.verdicts.update(other.verdicts)
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "records": self.records,
+            "truncated": self.truncated,
+            "missing": self.missing,
+            "count": self.count,
+            "mean": self.mean,
+            "variance": self.variance,
+            "m2": self.m2,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "hist": {"min": self.hist_min, "max": self.hist_max, "counts": self.hist},
+            "verdicts": dict(self.verdicts),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GroupStats":
+        hist = data["hist"]
+        stats = cls(len(hist["counts"]), hist["min"], hist["max"])
+        stats.records, stats.missing, stats.count = data["records"], data["missing"], data["count"]
+        stats.truncated = data.get("truncated", 0)
+        stats.mean, stats.m2 = data["mean"], data["m2"]
+        stats.min = data["min"] if data["min"] is not None else math.inf
+        stats.max = data["max"] if data["max"] is not None else -math.inf
+        stats.hist = list(hist["counts"])
+        stats.verdicts = Counter(data["verdicts"])
+        return stats
+
+
+class OnlineAggregator:
+    """
+    按 (template, model) 分组的在线聚合，定期持久化为 JSON（按记录计数，见 GroupStats）
+    results_offset 记录持久化时 results.jsonl 的字节偏移，断点续跑时只需补扫其后的部分。
+    """
+
+    def __init__(self, config: ScoreConfig):
+        self.config = config
+        self.groups: Dict[str, GroupStats] = {}
+        self.results_offset = 0
+
+    @staticmethod
+    def group_key(template: Optional[str], model: Optional[str]) -> str:
+        return f"{template}|{model}"
+
+    def add(self, group: str, value: Optional[Score], truncated: bool = False):
+        stats = self.groups.get(group)
+        if stats is None:
+            stats = self.groups[group] = GroupStats(self.config.bins, self.config.hist_min, self.config.hist_max)
+        stats.add(value, truncated)
+
+    def merge(self, other: "OnlineAggregator"):
+        for key, stats in other.groups.items():
+            if key in self.groups:
+                self.groups[key].merge(stats)
+            else:
+                self.groups[key] = stats
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "results_offset": self.results_offset,
+            "groups": {key: stats.to_dict() for key, stats in self.groups.items()},
+        }
+
+    def save(self, path: Union[str, Path]):
+        """原子写入（先写临时文件再替换），读取方不会看到半个文件"""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_text(dumps(self.to_dict()), encoding="utf-8")
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], config: ScoreConfig) -> "OnlineAggregator":
+        agg = cls(config)
+        data = loads(Path(path).read_bytes())
+        agg.results_offset = data.get("results_offset", 0)
+        agg.groups = {key: GroupStats.from_dict(stats) for key, stats in data["groups"].items()}
+        return agg
+
+    def summary_lines(self) -> Iterable[str]:
+        for key, s in self.groups.items():
+            line = f"{key}: records={s.records} (truncated={s.truncated}) missing={s.missing}"
+            if s.count:
+                line += f" mean={s.mean:.3f} std={math.sqrt(s.variance):.3f} min={s.min:g} max={s.max:g}"
+            if s.verdicts:
+                line += f" verdicts={dict(s.verdicts.most_common(5))}"
+            yield line
+
+
+def merge_aggregate_files(paths: Iterable[Union[str, Path]], config: ScoreConfig) -> OnlineAggregator:
+    """合并多个进程各自持久化的聚合文件"""
+    merged = OnlineAggregator(config)
+    for path in paths:
+        merged.merge(OnlineAggregator.load(path, config))
+    return merged
@@ -1,9 +1,11 @@
 import base64
 import io
-from PIL import Image
-import tiktoken
 from api_tool.utils.image_utils import compute_scale
 def count_tokens(messages, model: str):
+    # tiktoken / PIL 导入较慢，仅在统计时导入
+    import tiktoken
+    from PIL import Image
+
     try:
         enc = tiktoken.encoding_for_model(model)
     except Exception:
@@ -22,6 +22,9 @@ setup(
         "seaborn>=0.12.3",
         "httpx>=0.26.0"
     ],
+    extras_require={
+        "fast": ["orjson>=3.9.0"],  # 可选：更快的 JSONL 编解码
+    },
     entry_points={
         "console_scripts": [
             "api=api_tool.main:app",  # ← 注意这里要用 :app